@@ -1,38 +1,300 @@
+import datetime
+import os
+import time
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from scipy.stats import gaussian_kde
 import numpy as np
+from client_view import CLIENT_VIEW_COLUMNS, CLIENT_VIEW_MAX_ROWS, client_view_html, pack_view
+from data_store import dataset_version, filter_options
+from filter_pipeline import FilterPipeline
+from filters import FILTER_COLUMNS
+from figures import (DEFERRED_FIGURES, SECTION_FIGURES, THERMOMETER_DIMENSIONS, thermometer, thermometer_rollup, timeline,
+                     timeline_rollup)
+from inventory import LiveInventory, selection_touched, uncompacted_deltas
+from metrics import EXPIRING_COLUMNS, EXPIRING_PAGE_SIZE, EXPIRING_SOON_DAYS, SECTION_METRICS
+from profiling import PROFILERS, CodeProfile, StageRecorder
+from queries import FrameQuery
+from ranking import ExpiringSoon
+from replenishment import MAX_DAYS_OF_COVER, SALES_WINDOW_DAYS
+from query_cache import QueryCache, normalize_selection
+from section_executor import DEFAULT_TIMEOUT, SectionExecutor
+from timeseries import TIMELINE_DATES, TIMELINE_MEASURES
 
 # Streamlit App Configuration
 st.set_page_config(page_title="Advanced Pharma Dashboard", layout="wide")
 
+# Set DASHBOARD_ADMIN=1 to get the instrumentation panel in the sidebar.
+ADMIN = bool(os.environ.get("DASHBOARD_ADMIN"))
+# DASHBOARD_BACKEND=duckdb answers filters and aggregates in SQL (see sql_backend.py) instead of pandas.
+BACKEND = os.environ.get("DASHBOARD_BACKEND", "pandas")
+# Seconds a deferred chart may take to build before it is reported instead of drawn.
+CHART_TIMEOUT = float(os.environ.get("DASHBOARD_CHART_TIMEOUT", DEFAULT_TIMEOUT))
+# DASHBOARD_SNAPSHOT=<site directory written by report.py> serves its precomputed KPIs while the data is unchanged.
+SNAPSHOT = os.environ.get("DASHBOARD_SNAPSHOT")
+# Largest filtered view shipped to the browser when "Filter in the browser" is on.
+CLIENT_ROWS = int(os.environ.get("DASHBOARD_CLIENT_ROWS", CLIENT_VIEW_MAX_ROWS))
+
+@st.cache_resource
+def load_stage_recorder():
+    return StageRecorder()
+
+stage_recorder = load_stage_recorder()
+rerun = stage_recorder.start_rerun()
+code_profile = None
+if ADMIN and st.session_state.pop("profile_next_rerun", None):
+    try:
+        code_profile = CodeProfile(st.session_state.get("profiler_kind", PROFILERS[0]))
+        code_profile.start()
+    except RuntimeError as error:
+        st.sidebar.error(str(error))
+
 st.title("PHARMACY INVENTORY DASHBOARD")
 st.divider()
 # Load Data
-@st.cache_data
-def load_data():
-    file_path = 'enhanced_medicine_inventory_dataset.csv'
-    data = pd.read_csv(file_path,encoding='cp1252')
-    data['Expiry Date'] = pd.to_datetime(data['Expiry Date'])
-    data['Manufacture Date'] = pd.to_datetime(data['Manufacture Date'])
-    data['Total Cost'] = data['Cost Price ($)'] * data['Units Sold']
-    data['Total Revenue'] = data['Selling Price ($)'] * data['Units Sold']
-    data['Profit'] = data['Total Revenue'] - data['Total Cost']
-    data['Total Profit Margin (%)'] = (data['Profit'] / data['Total Revenue']) * 100
-    data['Cost Efficiency (%)'] = (data['Total Cost'] / data['Total Revenue']) * 100
-    data['Stock Gap'] = data['Reorder Level'] - data['Count']
-
-    return data
-
-data = load_data()
+@st.cache_resource
+def load_inventory(source_version):
+    return LiveInventory()
+
+@st.cache_resource
+def load_sql_inventory(source_version):
+    from sql_backend import SqlInventory
+    return SqlInventory()
+
+@st.cache_resource
+def load_query_cache():
+    return QueryCache()
+
+@st.cache_resource
+def load_section_executor():
+    return SectionExecutor()
+
+@st.cache_resource
+def load_snapshot(path):
+    from report import Snapshot
+    return Snapshot(path)
+
+today = datetime.date.today()
+sql_inventory = None
+with rerun.stage('load'):
+    query_cache = load_query_cache()
+    section_executor = load_section_executor()
+    if BACKEND == 'duckdb':
+        # Deltas reach this backend once compacted into the store ('python inventory.py --compact');
+        # refresh then rebuilds the database from it and reopens it.
+        sql_inventory = load_sql_inventory(dataset_version())
+        sql_inventory.refresh()
+        version = sql_inventory.version + (str(today),)
+        touched = []
+        pending_deltas = uncompacted_deltas()
+    else:
+        inventory = load_inventory(dataset_version())
+        # Days to Expiry is derived from Expiry Date for today, not read from the CSV.
+        inventory.roll_to(today)
+        previous_version = inventory.version
+        touched = inventory.refresh()
+        # This run reads one published snapshot throughout, whatever other sessions apply meanwhile.
+        current = inventory.snapshot
+        version = current.version
+snapshot = load_snapshot(SNAPSHOT) if SNAPSHOT else None
+if snapshot is not None and snapshot.version != tuple(version):
+    snapshot = None
+if sql_inventory is not None and pending_deltas:
+    st.sidebar.warning(f"{len(pending_deltas)} staged delta file(s) are not shown: the DuckDB backend reads "
+                       "compacted data only. Run `python inventory.py --compact` to include them.")
+if touched:
+    # Cached views whose selection no delta row can match stay valid for the new version.
+    query_cache.carry_over(previous_version, version,
+        lambda selection: not any(selection_touched(selection, changes) for changes in touched))
+
+if sql_inventory is None:
+    data = current.data
+    filter_index = current.filter_index
+    expiry_index = current.expiry_index
+    cube = current.cube
+    options = {column: filter_options(data, column) for column in FILTER_COLUMNS}
+else:
+    options = sql_inventory.options
+
+@st.fragment(run_every="5s")
+def watch_deltas():
+    if sql_inventory is None and inventory.pending_deltas():
+        st.rerun()
+
+def select_rows(selection):
+    """The rows matching `selection`, or None if there are none.
+
+    A SqlQuery on the DuckDB backend; otherwise their positions and frame, both
+    None when nothing is filtered out.
+    """
+    with rerun.stage('filter'):
+        if sql_inventory is not None:
+            query = sql_inventory.query(selection, today)
+            return query if query.count() else None
+        if not normalize_selection(selection):
+            return None, None
+        rows = np.flatnonzero(filter_index.mask(selection)[:len(data)])
+        return (rows, data.iloc[rows]) if len(rows) else None
+
+pipeline = FilterPipeline(st.session_state, query_cache, version, select_rows)
+
+def section_view(section):
+    """Selection, query over the shared filtered view and the section's metrics, memoized per dataset version."""
+    selection, view = pipeline.view()
+    if sql_inventory is not None:
+        query = view
+    else:
+        rows, frame = view
+        frame = data if rows is None else frame
+        # Scalar KPIs and per-group totals roll up cube cells instead of scanning rows.
+        query = cube.slice(selection, today, rows=FrameQuery(frame))
+
+    def compute():
+        with rerun.stage('kpis', section=section):
+            precomputed = snapshot.metrics(section, selection) if snapshot is not None else None
+            if precomputed is not None:
+                return precomputed
+            if sql_inventory is not None:
+                return SECTION_METRICS[section](None, query=query)
+            extra = {}
+            if section == 'overview':
+                expiring = expiry_index.expiring_within(EXPIRING_SOON_DAYS)
+                if rows is not None:
+                    expiring = expiring[filter_index.mask(selection)[:len(data)][expiring]]
+                extra['expiring'] = ExpiringSoon(data, expiring)
+            return SECTION_METRICS[section](frame, query=query, **extra)
+
+    return selection, query, pipeline.cached(section, selection, compute)
+
+def section_aggregate(section, selection, name, compute):
+    return pipeline.cached(section, selection, compute, name)
+
+def section_aggregator(section, selection):
+    return lambda name, compute: section_aggregate(section, selection, name, compute)
+
+def section_figure(section, name, view, metrics, selection):
+    with rerun.stage('figure', section=section, chart=name):
+        return SECTION_FIGURES[section][name](view, metrics, section_aggregator(section, selection))
+
+def plotly_chart(container, fig, section, chart):
+    """st.plotly_chart, timed; in admin mode also records the figure's JSON payload size."""
+    start = time.perf_counter()
+    container.plotly_chart(fig, use_container_width=True)
+    labels = {'section': section, 'chart': chart}
+    if ADMIN:
+        labels['bytes'] = len(fig.to_json())
+    rerun.record('plotly_chart', time.perf_counter() - start, **labels)
+
+def thermometer_section_chart(view, selection):
+    """Count vs Reorder Level rolled up per chosen dimension, one page of the top groups at a time."""
+    dimension = st.selectbox("Group by: ", THERMOMETER_DIMENSIONS, key="thermometer_dimension")
+    page = st.session_state.get("thermometer_page", 1)
+    aggregate = section_aggregator('overview', selection)
+    _, pages = thermometer_rollup(view, dimension, page, aggregate)
+    if page > pages:
+        st.session_state.thermometer_page = pages
+    st.number_input(f"Page (of {pages}): ", min_value=1, max_value=pages, key="thermometer_page")
+    return thermometer(view, None, aggregate, dimension, page)
+
+deferred_charts = []
+
+def timeline_section_chart(view, selection):
+    """A measure over expiry or manufacture date, bucketed for the visible range."""
+    col1, col2 = st.columns(2)
+    date_column = col1.selectbox("Date: ", TIMELINE_DATES, key="timeline_date")
+    measure = col2.selectbox("Measure: ", TIMELINE_MEASURES, key="timeline_measure")
+    aggregate = section_aggregator('operational', selection)
+    first, last = timeline_rollup(view, date_column, aggregate).span()
+    start = end = None
+    if first is not None and first < last:
+        key = f"timeline_range_{date_column}"
+        chosen = st.session_state.get(key)
+        if chosen is not None and not first <= chosen[0] <= chosen[1] <= last:
+            # The filters moved the span; start over from all of it.
+            del st.session_state[key]
+        start, end = st.slider("Visible range: ", min_value=first, max_value=last, value=(first, last), key=key)
+    return timeline(view, None, aggregate, date_column, measure, start, end)
+
+def draw_chart(section, chart, view, metrics, selection, task=None):
+    if chart == 'thermometer':
+        fig = thermometer_section_chart(view, selection)
+    elif chart == 'timeline':
+        fig = timeline_section_chart(view, selection)
+    elif task is not None:
+        try:
+            fig = task.result()
+        except Exception as error:
+            # One failed or slow chart leaves the rest of the section alone.
+            st.error(f"{DEFERRED_FIGURES[chart]} could not be drawn: {error}")
+            return
+    else:
+        fig = section_figure(section, chart, view, metrics, selection)
+    plotly_chart(st, fig, section, chart)
+
+@st.fragment
+def deferred_chart(section, chart, view, metrics, selection, task):
+    # A fragment, so the chart's own widgets (the thermometer's pager) rerun only this chart.
+    draw_chart(section, chart, view, metrics, selection, task)
+
+def section_chart(container, section, chart, view, metrics, selection):
+    """Draw a chart now, or for DEFERRED_FIGURES leave a placeholder in an expander and queue it for later.
+
+    Queued charts start building on the section executor straight away, so they
+    build side by side while the rest of the section is laid out.
+    """
+    if chart not in DEFERRED_FIGURES:
+        with container:
+            draw_chart(section, chart, view, metrics, selection)
+        return
+    expander = container.expander(DEFERRED_FIGURES[chart], expanded=True, key=f"{section}_{chart}_open",
+                                  on_change="rerun")
+    if expander.open:
+        slot = expander.empty()
+        slot.caption("Loading…")
+        task = None
+        if chart != 'thermometer':
+            # The thermometer reads its own widgets, so it is built when drawn.
+            task = section_executor.submit(lambda: section_figure(section, chart, view, metrics, selection),
+                                           CHART_TIMEOUT)
+        deferred_charts.append((slot, section, chart, view, metrics, selection, task))
+
+def draw_deferred_charts():
+    rerun.mark('first_paint')
+    for slot, *unit in deferred_charts:
+        with slot.container():
+            deferred_chart(*unit)
+
+def client_view(selection, query):
+    """Ship the filtered view to the browser once, as a separate explorer whose own filters, KPIs and bar
+    charts re-aggregate it there without reruns. The filters above and the section charts stay server-side."""
+    rows = query.count()
+    if rows > CLIENT_ROWS:
+        st.caption(f"Filtering in the browser needs at most {CLIENT_ROWS:,} rows; narrow the filters above "
+                   f"(now {rows:,} rows).")
+        return
+    page = pipeline.cached('client_view', selection,
+                           lambda: client_view_html(pack_view(query.table(CLIENT_VIEW_COLUMNS))))
+    st.iframe(page, height=720)
+
+SECTIONS = {
+    "📊 Overview": 'overview',
+    "💰 Financial Metrics": 'financial',
+    "📈 Performance Metrics": 'performance',
+    "⚙️ Operational Metrics": 'operational',
+    "📦 Replenishment": 'replenishment',
+}
+FILTER_LABELS = {
+    'Category': "Category: ",
+    'Dosage Form': "Dosage Form: ",
+    'Warehouse Location': "Warehouse: ",
+    'Target Ailment': "Target Ailment: ",
+    'Supplier Name': "Supplier Name: ",
+}
 
 if "selected_section" not in st.session_state:
     st.session_state.selected_section = "📊 Overview"
 
 # Section selection buttons
-col1, col2, col3, col4 = st.columns(4)
+col1, col2, col3, col4, col5 = st.columns(5)
 
 with col1:
     if st.button("📊 Overview"):
@@ -46,545 +308,174 @@ with col3:
 with col4:
     if st.button("⚙️ Operational Metrics"):
         st.session_state.selected_section = "⚙️ Operational Metrics"
+with col5:
+    if st.button("📦 Replenishment"):
+        st.session_state.selected_section = "📦 Replenishment"
+st.divider()
+
+section_label = st.session_state.selected_section
+section = SECTIONS[section_label]
+st.markdown(section_label, unsafe_allow_html=True)
+
+# One row of filters shared by every section; the choices live in session state.
+for column, container in zip(FILTER_COLUMNS, st.columns(len(FILTER_COLUMNS))):
+    container.multiselect(FILTER_LABELS[column], options[column], key=FilterPipeline.key(column))
+if not pipeline.matches():
+    st.info("No rows match these filters; showing the whole inventory.")
+selection, view, metrics = section_view(section)
+if st.sidebar.toggle("Filter in the browser", key="client_filtering",
+                     help="Add an explorer of the filtered view (up to the row limit) that re-filters its own "
+                          "KPIs and bar charts in the browser, without reruns. The filters above still rerun."):
+    client_view(selection, view)
 st.divider()
 
 # Layout for Each Section
-if st.session_state.selected_section == "📊 Overview":
-    st.markdown("📊 Overview", unsafe_allow_html=True)
-    
-    unique_Category = data['Category'].unique()
-    unique_DosageForm = data['Dosage Form'].unique()
-    unique_warehouse = data['Warehouse Location'].unique()
-    unique_ailment = data['Target Ailment'].unique()
-    unique_supplier = data['Supplier Name'].unique()
-    
-    col1, col2, col3, col4, col5 = st.columns(5)
-    with col1:
-        catg = st.multiselect("Category: ",unique_Category, key="key1")
-    with col2:
-        dose = st.multiselect("Dosage Form: ",unique_DosageForm, key="key2")
-    with col3:  
-        ware = st.multiselect("Warehouse: ",unique_warehouse, key="key3")
-    with col4:
-        target = st.multiselect("Target Ailment: ",unique_ailment, key="key4")
-    with col5:
-        supplier = st.multiselect("Supplier Name: ",unique_supplier, key="key5")
-
-    filter_condition = pd.Series(True, index=data.index)
-
-    ## """Making the filter conditions work inside the Dashboard"""
-
-    if catg:
-        filter_condition &= data['Category'].isin(catg)
-    if dose:
-        filter_condition &= data['Dosage Form'].isin(dose)
-    if ware:
-        filter_condition &= data['Warehouse Location'].isin(ware)
-    if target:
-        filter_condition &= data['Target Ailment'].isin(target)
-    if supplier:
-        filter_condition &= data['Supplier Name'].isin(supplier)
-
-    filtered_data = data[filter_condition]
+if section == 'overview':
+    # KPI Cards
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Unique Medicines", metrics['unique_medicines'], border=True)
+    col2.metric("Avg Units in Stock", metrics['avg_units_in_stock'], border=True)
+    col3.metric("No.of Tablets Expiring Soon", metrics['expiring_soon_count'], border=True)
+    col4.metric("Total Batches", metrics['total_batches'], border=True)
     st.divider()
-    
-    if not filtered_data.empty:
-        # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Unique Medicines", filtered_data['Medicine Name'].nunique(), border=True)
-        col2.metric("Avg Units in Stock", round(filtered_data['Count'].mean(), 0), border=True)
-        col3.metric("No.of Tablets Expiring Soon", filtered_data[filtered_data['Days to Expiry'] <= 30]['Count'].sum(), border=True)
-        col4.metric("Total Batches", filtered_data['Batch Number'].nunique(), border=True)
-        st.divider()
-    
-        # Charts
-        #st.markdown("### Key Insights")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            top_medicines = (filtered_data.groupby('Medicine Name', as_index=False)['Total Revenue'].sum().sort_values(by='Total Revenue', ascending=False).head(10))
-            st.markdown("Top 10 Medicines by Revenue")
-            st.dataframe(top_medicines,hide_index=True,use_container_width=True)
-    
-    
-        with col2:
-            expiring_soon = filtered_data[filtered_data['Days to Expiry'] <= 30][['Medicine Name', 'Days to Expiry', 'Category']].sort_values(by='Days to Expiry')
-            st.markdown("Medicines Expiring Soon (Within 30 Days)")
-            st.dataframe(expiring_soon,hide_index=True,use_container_width=True)
-    
-        st.divider()
-        col3, col4, col5 = st.columns(3)
-        
-        with col3:
-            fig1 = px.box(filtered_data,x='Category', y='Selling Price ($)', title="Distribution of Selling Price by Category",color='Category',
-            color_discrete_sequence=px.colors.qualitative.Plotly)
-            st.plotly_chart(fig1, use_container_width=True)
-        
-        with col4:
-            fig = go.Figure()
-            fig.add_trace(go.Bar(x=filtered_data['Medicine Name'],y=filtered_data['Count'],name="Count",marker_color="green",
-                text=filtered_data['Count'],textposition="outside"))
-            fig.add_trace(go.Bar(x=filtered_data['Medicine Name'],y=filtered_data['Reorder Level'],name="Reorder Level",marker_color="red",
-             	opacity=0.6,text=filtered_data['Reorder Level'],textposition="outside"))
-            fig.update_layout(title="Thermometer Chart: Count vs Reorder Level",xaxis_title="Medicine Name",
-                yaxis_title="Count",barmode="overlay", template="plotly_white",legend=dict(title="Metrics"))
-            st.plotly_chart(fig, use_container_width=True)
-    
-        with col5:
-            fig3 = px.box(filtered_data, y='Profit Margin (%)', title="Profit Margin Distribution")
-            st.plotly_chart(fig3, use_container_width=True)
-        
-    else:
-        # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Unique Medicines", data['Medicine Name'].nunique(), border=True)
-        col2.metric("Avg Units in Stock", round(data['Count'].mean(), 0), border=True)
-        col3.metric("No.of Tablets Expiring Soon", data[data['Days to Expiry'] <= 30]['Count'].sum(), border=True)
-        col4.metric("Total Batches", data['Batch Number'].nunique(), border=True)
-        st.divider()
-    
-        # Charts
-        #st.markdown("### Key Insights")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            top_medicines = (filtered_data.groupby('Medicine Name', as_index=False)['Total Revenue'].sum().sort_values(by='Total Revenue', ascending=False).head(10))
-            st.markdown("Top 10 Medicines by Revenue")
-            st.dataframe(top_medicines,hide_index=True,use_container_width=True)
-    
-    
-        with col2:
-            expiring_soon = data[data['Days to Expiry'] <= 30][['Medicine Name', 'Days to Expiry', 'Category']].sort_values(by='Days to Expiry')
-            st.markdown("Medicines Expiring Soon (Within 30 Days)")
-            st.dataframe(expiring_soon,hide_index=True,use_container_width=True)
-    
-        st.divider()
-        col3, col4, col5 = st.columns(3)
-        
-        with col3:
-            fig1 = px.box(data,x='Category', y='Selling Price ($)', title="Distribution of Selling Price by Category",color='Category',
-            color_discrete_sequence=px.colors.qualitative.Plotly)
-            st.plotly_chart(fig1, use_container_width=True)
-        
-        with col4:
-            fig = go.Figure()
-            fig.add_trace(go.Bar(x=data['Medicine Name'],y=data['Count'],name="Count",marker_color="green",
-                text=data['Count'],textposition="outside"))
-            fig.add_trace(go.Bar(x=data['Medicine Name'],y=data['Reorder Level'],name="Reorder Level",marker_color="red",
-             	opacity=0.6,text=data['Reorder Level'],textposition="outside"))
-            fig.update_layout(title="Thermometer Chart: Count vs Reorder Level",xaxis_title="Medicine Name",
-                yaxis_title="Count",barmode="overlay", template="plotly_white",legend=dict(title="Metrics"))
-            st.plotly_chart(fig, use_container_width=True)
-    
-        with col5:
-            fig3 = px.box(data, y='Profit Margin (%)', title="Profit Margin Distribution")
-            st.plotly_chart(fig3, use_container_width=True)
-        st.divider()
-
-elif st.session_state.selected_section == "💰 Financial Metrics":
-    st.markdown("💰 Financial Metrics", unsafe_allow_html=True)
-    
-    unique_Category = data['Category'].unique()
-    unique_DosageForm = data['Dosage Form'].unique()
-    unique_warehouse = data['Warehouse Location'].unique()
-    unique_ailment = data['Target Ailment'].unique()
-    unique_supplier = data['Supplier Name'].unique()
-    
-    col1, col2, col3, col4, col5 = st.columns(5)
+
+    # Charts
+    col1, col2 = st.columns(2)
+
     with col1:
-        catg = st.multiselect("Category: ",unique_Category, key="key6")
+        top_medicines = metrics['top_medicines']
+        st.markdown("Top 10 Medicines by Revenue")
+        st.dataframe(top_medicines,hide_index=True,use_container_width=True)
+
     with col2:
-        dose = st.multiselect("Dosage Form: ",unique_DosageForm, key="key7")
-    with col3:  
-        ware = st.multiselect("Warehouse: ",unique_warehouse, key="key8")
-    with col4:
-        target = st.multiselect("Target Ailment: ",unique_ailment, key="key9")
-    with col5:
-        supplier = st.multiselect("Supplier Name: ",unique_supplier, key="key10")
-
-    filter_condition = pd.Series(True, index=data.index)
-
-    ## """Making the filter conditions work inside the Dashboard"""
-
-    if catg:
-        filter_condition &= data['Category'].isin(catg)
-    if dose:
-        filter_condition &= data['Dosage Form'].isin(dose)
-    if ware:
-        filter_condition &= data['Warehouse Location'].isin(ware)
-    if target:
-        filter_condition &= data['Target Ailment'].isin(target)
-    if supplier:
-        filter_condition &= data['Supplier Name'].isin(supplier)
-
-    filtered_data = data[filter_condition]
+        expiring_soon = metrics['expiring_soon']
+        st.markdown("Medicines Expiring Soon (Within 30 Days)")
+        pages = -(-len(metrics['expiring']) // EXPIRING_PAGE_SIZE)
+        if pages > 1:
+            if st.session_state.get("expiring_page", 1) > pages:
+                st.session_state.expiring_page = pages
+            page = st.number_input(f"Page (of {pages}): ", min_value=1, max_value=pages, key="expiring_page")
+            expiring_soon = metrics['expiring'].page(page - 1, EXPIRING_PAGE_SIZE)[EXPIRING_COLUMNS]
+        st.dataframe(expiring_soon,hide_index=True,use_container_width=True)
+
     st.divider()
-    
-    if not filtered_data.empty:
-        # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Avg Cost Price", round(filtered_data['Cost Price ($)'].mean(), 2), border=True)
-        col2.metric("Avg Selling Price", round(filtered_data['Selling Price ($)'].mean(), 2), border=True)
-        col3.metric("Avg Discounts in %", round(filtered_data['Discount (%)'].mean(), 2), border=True)
-        col4.metric("Profit Margin", round(filtered_data['Profit Margin (%)'].mean(), 2), border=True)
-        st.divider()
-    
-        # Charts
-        #st.markdown("### Financial Trends")
-        col1, col2 = st.columns(2)
-    
-        fig1 = px.sunburst(filtered_data,path=['Category'],values='Total Revenue',color='Profit',color_continuous_scale='RdBu',
-                           title="Financial Breakdown by Category")
-        col1.plotly_chart(fig1, use_container_width=True)
-    
-    
-        fig2 = px.bar(filtered_data, x='Category', y='Selling Price ($)', title="Avg Selling Price by Category", color='Category')
-        col2.plotly_chart(fig2, use_container_width=True)
-        st.divider()
-    
-        col3, col4 = st.columns(2)
-    
-        fig4 = px.scatter(filtered_data,x='Total Revenue',y='Profit',size='Units Sold',color='Category',
-        title="Revenue vs Profit",hover_data=['Category', 'Total Revenue', 'Profit'])
-        col3.plotly_chart(fig4, use_container_width=True)
-    
-        fig5 = px.treemap(filtered_data, path=['Category', 'Medicine Name'], values='Profit Margin (%)', title="Profit Margin by Category")
-        col4.plotly_chart(fig5, use_container_width=True)
-        st.divider()
-        
-    else:
-        # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Avg Cost Price", round(data['Cost Price ($)'].mean(), 2), "$", border=True)
-        col2.metric("Avg Selling Price", round(data['Selling Price ($)'].mean(), 2), "$", border=True)
-        col3.metric("Avg Discounts in %", round(data['Discount (%)'].mean(), 2), "%", border=True)
-        col4.metric("Profit Margin", round(data['Profit Margin (%)'].mean(), 2), "%", border=True)
-    
-        # Charts
-        #st.markdown("### Financial Trends")
-        col1, col2 = st.columns(2)
-    
-        fig1 = px.sunburst(data,path=['Category'],values='Total Revenue',color='Profit',color_continuous_scale='RdBu',
-                           title="Financial Breakdown by Category")
-        col1.plotly_chart(fig1, use_container_width=True)
-    
-    
-        fig2 = px.bar(data, x='Category', y='Selling Price ($)', title="Avg Selling Price by Category", color='Category')
-        col2.plotly_chart(fig2, use_container_width=True)
-        st.divider()
-    
-        col3, col4 = st.columns(2)
-    
-        fig4 = px.scatter(data,x='Total Revenue',y='Profit',size='Units Sold',color='Category',
-        title="Revenue vs Profit",hover_data=['Category', 'Total Revenue', 'Profit'])
-        col3.plotly_chart(fig4, use_container_width=True)
-    
-        fig5 = px.treemap(data, path=['Category', 'Medicine Name'], values='Profit Margin (%)', title="Profit Margin by Category")
-        col4.plotly_chart(fig5, use_container_width=True)
-        st.divider()
-
-elif st.session_state.selected_section == "📈 Performance Metrics":
-    st.markdown("📈 Performance Metrics", unsafe_allow_html=True)
-    
-    unique_Category = data['Category'].unique()
-    unique_supplier = data['Supplier Name'].unique()
-    unique_warehouse = data['Warehouse Location'].unique()
-    unique_ailment = data['Target Ailment'].unique()
-    
+    col3, col4, col5 = st.columns(3)
+    section_chart(col3, 'overview', 'selling_price_box', view, metrics, selection)
+    section_chart(col4, 'overview', 'thermometer', view, metrics, selection)
+    section_chart(col5, 'overview', 'profit_margin_box', view, metrics, selection)
+    st.divider()
+
+elif section == 'financial':
+    # KPI Cards
     col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        catg = st.multiselect("Category: ",unique_Category, key="key11")
-    with col2:
-        supplier = st.multiselect("Supplier Name: ",unique_supplier, key="key12")
-    with col3:  
-        ware = st.multiselect("Warehouse: ",unique_warehouse, key="key13")
-    with col4:
-        target = st.multiselect("Target Ailment: ",unique_ailment, key="key14")
-
-    filter_condition = pd.Series(True, index=data.index)
-
-    ## """Making the filter conditions work inside the Dashboard"""
-
-    if catg:
-        filter_condition &= data['Category'].isin(catg)
-    if supplier:
-        filter_condition &= data['Supplier Name'].isin(supplier)
-    if ware:
-        filter_condition &= data['Warehouse Location'].isin(ware)
-    if target:
-        filter_condition &= data['Target Ailment'].isin(target)
-
-    filtered_data = data[filter_condition]
+    col1.metric("Avg Cost Price", metrics['avg_cost_price'], border=True)
+    col2.metric("Avg Selling Price", metrics['avg_selling_price'], border=True)
+    col3.metric("Avg Discounts in %", metrics['avg_discount'], border=True)
+    col4.metric("Profit Margin", metrics['avg_profit_margin'], border=True)
     st.divider()
-    
-    if not filtered_data.empty:
-        # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Units Sold", filtered_data['Units Sold'].sum(), border=True)
-        threshold = 0.09 * filtered_data['Units Sold'].sum()
-        high_demand_medicines = (filtered_data.groupby('Medicine Name', as_index=False)['Units Sold'].sum())
-        high_demand_medicines = high_demand_medicines[high_demand_medicines['Units Sold'] > threshold]
-        num_high_demand_medicines = high_demand_medicines['Medicine Name'].nunique()
-        col2.metric("High Demand Medicines", num_high_demand_medicines, border=True)
-        col3.metric("Avg Units Sold", round(filtered_data['Units Sold'].mean(), 0), border=True)
-        top_seller = high_demand_medicines.loc[high_demand_medicines['Units Sold'].idxmax(), 'Medicine Name']
-        col4.metric("Top Seller", top_seller, border=True)
-        st.divider()
-    
-        # Charts
-        #st.markdown("### Performance Insights")
-        col1, col2 = st.columns(2)
-    
-        fig1 = px.bar(filtered_data.nlargest(10, 'Units Sold'), x='Medicine Name', y='Units Sold', title="Top 10 Medicines by Sales")
-        col1.plotly_chart(fig1, use_container_width=True)
-    
-        fig2 = px.pie(filtered_data, names='Dosage Form', title="Sales Distribution by Dosage Form", hole=0.4)
-        col2.plotly_chart(fig2, use_container_width=True)
-        st.divider()
-    
-        col3, col4, col5 = st.columns(3)
-        # Speedometer (Gauge) Chart for Average Profit Margin
-        avg_profit_margin = filtered_data['Profit Margin (%)'].mean()
-        
-        fig3 = go.Figure(go.Indicator(mode="gauge+number",value=avg_profit_margin,title={'text': "Average Profit Margin (%)"},
-            gauge={
-                'axis': {'range': [0, 100]},
-                'bar': {'color': "#4CAF50"},
-                'steps': [
-                    {'range': [0, 50], 'color': '#FFCDD2'},
-                    {'range': [50, 75], 'color': '#FFF9C4'},
-                    {'range': [75, 100], 'color': '#C8E6C9'}
-                ],
-            }
-        ))
-        col3.plotly_chart(fig3, use_container_width=True)
-    
-    
-        revenue_by_category = filtered_data.groupby('Category')['Total Revenue'].sum().reset_index()
-    
-        fig4 = px.pie(
-            revenue_by_category,
-            values='Total Revenue',
-            names='Category',
-            title="Revenue Distribution by Category",
-            color_discrete_sequence=px.colors.sequential.RdBu
-        )
-        col4.plotly_chart(fig4, use_container_width=True)
-    
-        # Bullet Chart for Revenue Target
-        revenue_target = 2 * filtered_data['Total Cost'].sum()  # Example revenue target
-        total_revenue = filtered_data['Total Revenue'].sum()
-        fig5 = go.Figure(go.Indicator(
-            mode="number+gauge+delta",
-            value=total_revenue,
-            delta={'reference': revenue_target, 'relative': True},
-            gauge={
-                'shape': "bullet",
-                'axis': {'range': [0, revenue_target]},
-                'bar': {'color': "darkblue"},
-                'steps': [
-                    {'range': [0, revenue_target * 0.5], 'color': "#FFCDD2"},
-                    {'range': [revenue_target * 0.5, revenue_target * 0.8], 'color': "#FFF9C4"},
-                    {'range': [revenue_target * 0.8, revenue_target], 'color': "#C8E6C9"}
-                ]
-            },
-            title={'text': "Revenue Target Achievement"}
-        ))
-        col5.plotly_chart(fig5, use_container_width=True)
-        st.divider()
-        
-    else:
 
-        # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Units Sold", data['Units Sold'].sum(), border=True)
-        threshold = 0.09 * data['Units Sold'].sum()
-        high_demand_medicines = (data.groupby('Medicine Name', as_index=False)['Units Sold'].sum())
-        high_demand_medicines = high_demand_medicines[high_demand_medicines['Units Sold'] > threshold]
-        num_high_demand_medicines = high_demand_medicines['Medicine Name'].nunique()
-        col2.metric("High Demand Medicines", num_high_demand_medicines, border=True)
-        col3.metric("Avg Units Sold", round(data['Units Sold'].mean(), 0), border=True)
-        top_seller = high_demand_medicines.loc[high_demand_medicines['Units Sold'].idxmax(), 'Medicine Name']
-        col4.metric("Top Seller", top_seller, border=True)
-        st.divider()
-    
-        # Charts
-        #st.markdown("### Performance Insights")
-        col1, col2 = st.columns(2)
-    
-        fig1 = px.bar(data.nlargest(10, 'Units Sold'), x='Medicine Name', y='Units Sold', title="Top 10 Medicines by Sales")
-        col1.plotly_chart(fig1, use_container_width=True)
-    
-        fig2 = px.pie(data, names='Dosage Form', title="Sales Distribution by Dosage Form", hole=0.4)
-        col2.plotly_chart(fig2, use_container_width=True)
-        st.divider()
-    
-        col3, col4, col5 = st.columns(3)
-        # Speedometer (Gauge) Chart for Average Profit Margin
-        avg_profit_margin = data['Profit Margin (%)'].mean()
-        
-        fig3 = go.Figure(go.Indicator(mode="gauge+number",value=avg_profit_margin,title={'text': "Average Profit Margin (%)"},
-            gauge={
-                'axis': {'range': [0, 100]},
-                'bar': {'color': "#4CAF50"},
-                'steps': [
-                    {'range': [0, 50], 'color': '#FFCDD2'},
-                    {'range': [50, 75], 'color': '#FFF9C4'},
-                    {'range': [75, 100], 'color': '#C8E6C9'}
-                ],
-            }
-        ))
-        col3.plotly_chart(fig3, use_container_width=True)
-    
-    
-        revenue_by_category = data.groupby('Category')['Total Revenue'].sum().reset_index()
-    
-        fig4 = px.pie(
-            revenue_by_category,
-            values='Total Revenue',
-            names='Category',
-            title="Revenue Distribution by Category",
-            color_discrete_sequence=px.colors.sequential.RdBu
-        )
-        col4.plotly_chart(fig4, use_container_width=True)
-    
-        # Bullet Chart for Revenue Target
-        revenue_target = 2 * data['Total Cost'].sum()  # Example revenue target
-        total_revenue = data['Total Revenue'].sum()
-        fig5 = go.Figure(go.Indicator(
-            mode="number+gauge+delta",
-            value=total_revenue,
-            delta={'reference': revenue_target, 'relative': True},
-            gauge={
-                'shape': "bullet",
-                'axis': {'range': [0, revenue_target]},
-                'bar': {'color': "darkblue"},
-                'steps': [
-                    {'range': [0, revenue_target * 0.5], 'color': "#FFCDD2"},
-                    {'range': [revenue_target * 0.5, revenue_target * 0.8], 'color': "#FFF9C4"},
-                    {'range': [revenue_target * 0.8, revenue_target], 'color': "#C8E6C9"}
-                ]
-            },
-            title={'text': "Revenue Target Achievement"}
-        ))
-        col5.plotly_chart(fig5, use_container_width=True)
-        st.divider()
-
-
-elif st.session_state.selected_section == "⚙️ Operational Metrics":
-    st.markdown("⚙️ Operational Metrics", unsafe_allow_html=True)
-    
-    unique_Category = data['Category'].unique()
-    unique_DosageForm = data['Dosage Form'].unique()
-    unique_warehouse = data['Warehouse Location'].unique()
-    unique_ailment = data['Target Ailment'].unique()
-    
+    # Charts
+    col1, col2 = st.columns(2)
+    section_chart(col1, 'financial', 'revenue_sunburst', view, metrics, selection)
+    section_chart(col2, 'financial', 'avg_selling_price', view, metrics, selection)
+    st.divider()
+
+    col3, col4 = st.columns(2)
+    section_chart(col3, 'financial', 'revenue_profit_scatter', view, metrics, selection)
+    section_chart(col4, 'financial', 'profit_margin_treemap', view, metrics, selection)
+    st.divider()
+
+elif section == 'performance':
+    # KPI Cards
     col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        catg = st.multiselect("Category: ",unique_Category, key="key15")
-    with col2:
-        dose = st.multiselect("Dosage Form: ",unique_DosageForm, key="key16")
-    with col3:  
-        ware = st.multiselect("Warehouse: ",unique_warehouse, key="key17")
-    with col4:
-        target = st.multiselect("Target Ailment: ",unique_ailment, key="key18")
-
-    filter_condition = pd.Series(True, index=data.index)
-
-    ## """Making the filter conditions work inside the Dashboard"""
-
-    if catg:
-        filter_condition &= data['Category'].isin(catg)
-    if dose:
-        filter_condition &= data['Dosage Form'].isin(dose)
-    if ware:
-        filter_condition &= data['Warehouse Location'].isin(ware)
-    if target:
-        filter_condition &= data['Target Ailment'].isin(target)
-
-    filtered_data = data[filter_condition]
+    col1.metric("Total Units Sold", metrics['total_units_sold'], border=True)
+    col2.metric("High Demand Medicines", metrics['high_demand_medicines'], border=True)
+    col3.metric("Avg Units Sold", metrics['avg_units_sold'], border=True)
+    col4.metric("Top Seller", metrics['top_seller'], border=True)
     st.divider()
-    
-    if not filtered_data.empty:
-        # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Avg Days to Expiry", round(filtered_data['Days to Expiry'].mean(), 0), border=True)
-        col2.metric("Stock in Warehouses", filtered_data['Count'].sum(), border=True)
-        col3.metric("Prescription Medicines", filtered_data[filtered_data['Prescription Required']].shape[0],border=True)
-        col4.metric("Avg Stock per Category", round(filtered_data.groupby('Category')['Count'].mean().mean(), 0), border=True)
-        st.divider()
-
-        # Charts
-        col1, col2 = st.columns(2)
-
-        # Chart 1: Bar chart with custom colors
-        fig1 = px.bar(filtered_data.groupby('Medicine Name')['Count'].sum().reset_index(), x='Medicine Name', y='Count', 
-            title="Stock by Medicine",color_discrete_sequence=px.colors.qualitative.Vivid)
-        col1.plotly_chart(fig1, use_container_width=True)
-        
-        # Chart 2: Line chart with a gradient color scale
-        fig2 = px.line(filtered_data.groupby('Expiry Date')['Count'].sum().reset_index(), x="Expiry Date", y="Count", 
-            title="Days to Expiry by Count",line_shape='spline',color_discrete_sequence=px.colors.qualitative.Bold)
-        col2.plotly_chart(fig2, use_container_width=True)
-        st.divider()
-        
-        col3, col4 = st.columns(2)
-        
-        # Chart 3: Box plot with vibrant colors
-        fig3 = px.box(filtered_data, x='Warehouse Location', y='Days to Expiry', title="Days to Expiry by Warehouse",
-            color='Warehouse Location', color_discrete_sequence=px.colors.qualitative.Pastel)
-        col3.plotly_chart(fig3, use_container_width=True)
-        
-        # Chart 4: Normal distribution line chart with colors
-        expiry_days = filtered_data['Days to Expiry'].dropna()
-        density = gaussian_kde(expiry_days)
-        x_vals = np.linspace(expiry_days.min(), expiry_days.max(), 1000)  # Generate x-axis values
-        y_vals = density(x_vals)  # Compute the density for each x value
-        
-        fig4 = px.line(x=x_vals, y=y_vals, title="Days to Expiry Distribution (Normal Distribution)")
-        fig4.update_layout(xaxis_title="Days to Expiry",yaxis_title="Density",template="plotly_white")
-        col4.plotly_chart(fig4, use_container_width=True)
-        st.divider()
-    
-    else:
-    
-        # KPI Cards
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Avg Days to Expiry", round(data['Days to Expiry'].mean(), 0), border=True)
-        col2.metric("Stock in Warehouses", data['Count'].sum(), border=True)
-        col3.metric("Prescription Medicines", data[data['Prescription Required']].shape[0],border=True)
-        col4.metric("Avg Stock per Category", round(data.groupby('Category')['Count'].mean().mean(), 0), border=True)
-        st.divider()
-    
-        # Charts
-        col1, col2 = st.columns(2)
-
-        # Chart 1: Bar chart with custom colors
-        fig1 = px.bar(data.groupby('Medicine Name')['Count'].sum().reset_index(), x='Medicine Name', y='Count', 
-            title="Stock by Medicine",color_discrete_sequence=px.colors.qualitative.Vivid)
-        col1.plotly_chart(fig1, use_container_width=True)
-        
-        # Chart 2: Line chart with a gradient color scale
-        fig2 = px.line(data.groupby('Expiry Date')['Count'].sum().reset_index(), x="Expiry Date", y="Count", 
-            title="Days to Expiry by Count",line_shape='spline',color_discrete_sequence=px.colors.qualitative.Bold)
-        col2.plotly_chart(fig2, use_container_width=True)
-        st.divider()
-        
-        col3, col4 = st.columns(2)
-        
-        # Chart 3: Box plot with vibrant colors
-        fig3 = px.box(data, x='Warehouse Location', y='Days to Expiry', title="Days to Expiry by Warehouse",
-            color='Warehouse Location', color_discrete_sequence=px.colors.qualitative.Pastel)
-        col3.plotly_chart(fig3, use_container_width=True)
-        
-        # Chart 4: Normal distribution line chart with colors
-        expiry_days = data['Days to Expiry'].dropna()
-        density = gaussian_kde(expiry_days)
-        x_vals = np.linspace(expiry_days.min(), expiry_days.max(), 1000)  # Generate x-axis values
-        y_vals = density(x_vals)  # Compute the density for each x value
-        
-        fig4 = px.line(x=x_vals, y=y_vals, title="Days to Expiry Distribution (Normal Distribution)")
-        fig4.update_layout(xaxis_title="Days to Expiry",yaxis_title="Density",template="plotly_white")
-        col4.plotly_chart(fig4, use_container_width=True)
-        st.divider()
-        
+
+    # Charts
+    col1, col2 = st.columns(2)
+    section_chart(col1, 'performance', 'top_sales', view, metrics, selection)
+    section_chart(col2, 'performance', 'dosage_form_pie', view, metrics, selection)
+    st.divider()
+
+    col3, col4, col5 = st.columns(3)
+    section_chart(col3, 'performance', 'profit_margin_gauge', view, metrics, selection)
+    section_chart(col4, 'performance', 'revenue_pie', view, metrics, selection)
+    section_chart(col5, 'performance', 'revenue_target', view, metrics, selection)
+    st.divider()
+
+elif section == 'operational':
+    # KPI Cards
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Avg Days to Expiry", metrics['avg_days_to_expiry'], border=True)
+    col2.metric("Stock in Warehouses", metrics['stock_in_warehouses'], border=True)
+    col3.metric("Prescription Medicines", metrics['prescription_medicines'],border=True)
+    col4.metric("Avg Stock per Category", metrics['avg_stock_per_category'], border=True)
+    st.divider()
+
+    # Charts
+    col1, col2 = st.columns(2)
+    section_chart(col1, 'operational', 'stock_by_medicine', view, metrics, selection)
+    section_chart(col2, 'operational', 'timeline', view, metrics, selection)
+    st.divider()
+
+    col3, col4 = st.columns(2)
+    # Chart 3: Box plot with vibrant colors
+    section_chart(col3, 'operational', 'expiry_box', view, metrics, selection)
+    # Chart 4: Normal distribution line chart with colors
+    section_chart(col4, 'operational', 'expiry_kde', view, metrics, selection)
+    st.divider()
+
+elif section == 'replenishment':
+    # KPI Cards
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Batches Below Reorder Level", metrics['below_reorder_batches'], border=True)
+    col2.metric("Stock Lines to Reorder", metrics['groups_to_reorder'], border=True)
+    col3.metric("Units to Order", metrics['units_to_order'], border=True)
+    col4.metric("Estimated Order Cost", metrics['order_cost'], border=True)
+    st.divider()
+
+    st.markdown("Purchase Suggestions (Fewest Days of Cover First)")
+    st.caption(f"Days of Cover is capped at {MAX_DAYS_OF_COVER}; stock lines with no sales in the last "
+               f"{SALES_WINDOW_DAYS} days show the cap.")
+    st.dataframe(metrics['purchase_suggestions'], hide_index=True, use_container_width=True)
+    st.divider()
+
+    col1, col2 = st.columns(2)
+    section_chart(col1, 'replenishment', 'order_by_warehouse', view, metrics, selection)
+    section_chart(col2, 'replenishment', 'days_of_cover', view, metrics, selection)
+    st.divider()
+
+draw_deferred_charts()
+
+watch_deltas()
+
+cache_stats = query_cache.stats()
+st.sidebar.caption(
+    f"Query cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+    f"{cache_stats['entries']} entries · {cache_stats['bytes'] / 2**20:.1f} / {cache_stats['max_bytes'] / 2**20:.0f} MiB"
+)
+
+stage_recorder.finish(rerun)
+if code_profile is not None:
+    code_profile.stop()
+    st.session_state.profile_report = code_profile.report()
+
+if ADMIN:
+    with st.sidebar.expander("Instrumentation"):
+        st.caption(f"This rerun: {rerun.total() * 1000:.0f} ms across {len(rerun.stages)} stages, "
+                   f"first paint after {rerun.marks.get('first_paint', 0) * 1000:.0f} ms")
+        st.dataframe([{**stage, 'ms': round(stage.pop('seconds') * 1000, 2)} for stage in map(dict, rerun.stages)],
+                     hide_index=True, use_container_width=True)
+        st.download_button("Stages (JSON lines)", stage_recorder.json_lines(), "stages.jsonl",
+                           mime="application/jsonl")
+        st.download_button("Stages (Prometheus)", stage_recorder.prometheus(), "stages.prom", mime="text/plain")
+        st.selectbox("Profiler: ", PROFILERS, key="profiler_kind")
+        if st.button("Profile next rerun"):
+            st.session_state.profile_next_rerun = True
+            st.rerun()
+        if "profile_report" in st.session_state:
+            st.download_button("Last profile", st.session_state.profile_report, "profile.txt", mime="text/plain")
+            st.code(st.session_state.profile_report, language=None)
@@ -0,0 +1,329 @@
+"""Benchmarks for the dashboard data paths.
+
+    python benchmark.py filters --rows 1000000 10000000
+    python benchmark.py kde --rows 10000 10000000
+    python benchmark.py cube --rows 1000 1000000
+    python benchmark.py store --rows 1000000
+    python benchmark.py sections --output results.json
+
+The sections suite runs every dashboard section headlessly on synthetic data
+generated for a fixed seed and day: loading the store, filtering, the section
+KPIs (from the rows, from the cube and, with --sql, from DuckDB), each figure
+builder and all of a section's figures at once on the section executor,
+recording wall time, peak traced memory and the figure's JSON payload size per
+stage.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import fake_data
+from charts import binned_kde
+from cube import InventoryCube
+from data_store import build_store, read_store, synthetic_frame
+from expiry import ExpiryIndex
+from figures import SECTION_FIGURES
+from filters import FILTER_COLUMNS, FilterIndex
+from metrics import EXPIRING_SOON_DAYS, SECTION_METRICS
+from queries import FrameQuery
+from ranking import ExpiringSoon
+from section_executor import SectionExecutor
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def isin_chain(data, selection):
+    filter_condition = pd.Series(True, index=data.index)
+    for column, chosen in selection.items():
+        if chosen:
+            filter_condition &= data[column].isin(chosen)
+    return data[filter_condition]
+
+
+def bench_filters(rows, repeat=5, seed=0):
+    data = synthetic_frame(rows, seed, columns=FILTER_COLUMNS)
+    for column in FILTER_COLUMNS:
+        data[column] = data[column].astype('category')
+    # Half of every column's values: the worst case, all five filters active.
+    selection = {column: data[column].cat.categories[::2].tolist() for column in FILTER_COLUMNS}
+
+    start = time.perf_counter()
+    index = FilterIndex(data)
+    build = time.perf_counter() - start
+
+    expected = isin_chain(data, selection)
+    assert expected.index.equals(index.filter(data, selection).index)
+    return {
+        'rows': rows,
+        'index_build_s': build,
+        'isin_chain_s': best_of(lambda: isin_chain(data, selection), repeat),
+        'bitmap_s': best_of(lambda: index.filter(data, selection), repeat),
+        'bitmap_mask_s': best_of(lambda: index.mask(selection), repeat),
+        'selected_rows': len(expected),
+    }
+
+
+# gaussian_kde is O(rows x points); compare against it on a subsample beyond this size.
+KDE_REFERENCE_ROWS = 200_000
+
+
+def bench_kde(rows, repeat=5, seed=0):
+    from scipy.stats import gaussian_kde
+
+    expiry_days = np.random.default_rng(seed).integers(0, 731, rows)
+    x_vals, _ = binned_kde(expiry_days)
+    reference = expiry_days[:KDE_REFERENCE_ROWS]
+    start = time.perf_counter()
+    expected = gaussian_kde(reference)(x_vals)
+    scipy_s = time.perf_counter() - start
+    _, y_check = binned_kde(reference)
+    error = np.abs(y_check - expected).max() / expected.max()
+    return {
+        'rows': rows,
+        'binned_s': best_of(lambda: binned_kde(expiry_days), repeat),
+        'gaussian_kde_s': scipy_s,
+        'gaussian_kde_rows': len(reference),
+        'max_relative_error': error,
+    }
+
+
+# Axis cardinalities of the wide cube case: many filter values and medicines, so few rows share a cell.
+WIDE_CARDINALITIES = {'Category': 12, 'Dosage Form': 8, 'Warehouse Location': 10, 'Target Ailment': 20,
+                      'Supplier Name': 30, 'Medicine Name': 300}
+
+
+def wide_frame(rows, seed=0, cardinalities=WIDE_CARDINALITIES):
+    """synthetic_frame with each cube axis redrawn uniformly over `cardinalities` values."""
+    rng = np.random.default_rng(seed)
+    data = synthetic_frame(rows, seed)
+    for column, size in cardinalities.items():
+        data[column] = pd.Categorical.from_codes(rng.integers(0, size, rows), [f"{column} {i}" for i in range(size)])
+    return data
+
+
+def bench_cube(rows, repeat=5, seed=0):
+    data = wide_frame(rows, seed)
+    cube, build, peak = measure(lambda: InventoryCube(data))
+    selection = {column: data[column].cat.categories[::2].tolist() for column in FILTER_COLUMNS}
+    view = data[FilterIndex(data).mask(selection)]
+
+    def kpis(query):
+        return query.count(), query.sum('Total Revenue'), query.mean('Profit'), query.nunique('Medicine Name')
+
+    return {
+        'rows': rows,
+        'cells': len(cube.keys),
+        'cube_bytes': cube.sums.nbytes + cube.counts.nbytes + cube.squares.nbytes + cube.rows.nbytes,
+        'build_s': build,
+        'build_peak_bytes': peak,
+        'rows_kpis_s': best_of(lambda: kpis(FrameQuery(view)), repeat),
+        'cube_kpis_s': best_of(lambda: kpis(cube.slice(selection)), repeat),
+    }
+
+
+def bench_store(rows, seed=0, workdir=None):
+    """Build a store from a generated CSV and measure what read_store copies out of the mapping."""
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        return _bench_store(rows, seed, tmp)
+
+
+def _bench_store(rows, seed, tmp):
+    csv_path = os.path.join(tmp, 'inventory.csv')
+    store_path = os.path.join(tmp, 'inventory.feather')
+    fake_data.write(csv_path, rows, seed, today=BENCHMARK_DAY)
+    start = time.perf_counter()
+    build_store(csv_path, store_path)
+    build = time.perf_counter() - start
+    with pa.memory_map(store_path) as source:
+        batches = ipc.open_file(source).num_record_batches
+    allocated = pa.total_allocated_bytes()
+    start = time.perf_counter()
+    data = read_store(store_path)
+    return {
+        'rows': len(data),
+        'csv_bytes': os.path.getsize(csv_path),
+        'store_bytes': os.path.getsize(store_path),
+        'batches': batches,
+        'build_s': build,
+        'read_s': time.perf_counter() - start,
+        # Arrow allocations are the copies; everything else stays shared through the page cache.
+        'copied_bytes': pa.total_allocated_bytes() - allocated,
+    }
+
+
+SECTION_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+# Generated data depends on the day, so the suite pins one.
+BENCHMARK_DAY = datetime.date(2025, 1, 1)
+
+
+def measure(func):
+    """Run `func` twice: untraced for its wall time, then under tracemalloc for its peak allocation in bytes.
+
+    Returns the result of the timed run, the wall time and the peak.
+    """
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_sections(rows, seed=0, workdir=None, sql=False):
+    """One record per stage: load, then filter, metrics and every figure of each section and selection."""
+    records = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        # Everything mapping files in `tmp` is local to _bench_sections, so it is released before `tmp` is removed.
+        _bench_sections(rows, seed, tmp, sql, records)
+    return records
+
+
+def _bench_sections(rows, seed, tmp, sql, records):
+    def record(stage, elapsed, peak, **extra):
+        records.append({'rows': rows, 'stage': stage, 'wall_s': elapsed, 'peak_bytes': peak, **extra})
+
+    csv_path = os.path.join(tmp, 'inventory.csv')
+    store_path = os.path.join(tmp, 'inventory.feather')
+    fake_data.write(csv_path, rows, seed, today=BENCHMARK_DAY)
+    _, elapsed, peak = measure(lambda: build_store(csv_path, store_path))
+    record('load_csv', elapsed, peak)
+    data, elapsed, peak = measure(lambda: read_store(store_path))
+    record('load_store', elapsed, peak)
+
+    index, elapsed, peak = measure(lambda: FilterIndex(data))
+    record('filter_index', elapsed, peak)
+    cube, elapsed, peak = measure(lambda: InventoryCube(data))
+    record('cube', elapsed, peak)
+    sql_inventory = None
+    if sql:
+        from sql_backend import SqlInventory
+        database_path = os.path.join(tmp, 'inventory.duckdb')
+        sql_inventory, elapsed, peak = measure(lambda: SqlInventory(csv_path, store_path, database_path))
+        record('load_sql', elapsed, peak)
+    expiry_index = ExpiryIndex(data['Expiry Date'], today=BENCHMARK_DAY)
+    expiring = expiry_index.expiring_within(EXPIRING_SOON_DAYS)
+    selections = {
+        'all': {},
+        # Half of every column's values: the worst case, all five filters active.
+        'half': {column: data[column].cat.categories[::2].tolist() for column in FILTER_COLUMNS},
+    }
+    executor = SectionExecutor()
+    for selection_name, selection in selections.items():
+        mask, elapsed, peak = measure(lambda: index.mask(selection))
+        view = data[mask] if selection else data
+        record('filter', elapsed, peak, selection=selection_name, selected_rows=len(view))
+        for section, compute_metrics in SECTION_METRICS.items():
+            extra = {'expiring': ExpiringSoon(data, expiring[mask[expiring]])} if section == 'overview' else {}
+            metrics, elapsed, peak = measure(lambda: compute_metrics(view, **extra))
+            record('metrics', elapsed, peak, selection=selection_name, section=section)
+            query = cube.slice(selection, BENCHMARK_DAY, rows=FrameQuery(view))
+            _, elapsed, peak = measure(lambda: compute_metrics(view, **extra, query=query))
+            record('metrics_cube', elapsed, peak, selection=selection_name, section=section)
+            if sql_inventory is not None:
+                sql_query = sql_inventory.query(selection, BENCHMARK_DAY)
+                _, elapsed, peak = measure(lambda: compute_metrics(None, query=sql_query))
+                record('metrics_sql', elapsed, peak, selection=selection_name, section=section)
+            for chart, build in SECTION_FIGURES[section].items():
+                figure, elapsed, peak = measure(lambda: build(query, metrics))
+                record('figure', elapsed, peak, selection=selection_name, section=section, chart=chart,
+                       json_bytes=len(figure.to_json()))
+            builds = {chart: (lambda build=build: build(query, metrics))
+                      for chart, build in SECTION_FIGURES[section].items()}
+            _, elapsed, peak = measure(lambda: executor.build_all(builds))
+            record('figures_parallel', elapsed, peak, selection=selection_name, section=section,
+                   workers=executor.workers)
+
+
+def environment():
+    import pandas
+    import plotly
+    import pyarrow
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'pyarrow': pyarrow.__version__,
+        'plotly': plotly.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('suite', choices=['filters', 'kde', 'cube', 'store', 'sections'])
+    parser.add_argument('--rows', type=int, nargs='+')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="sections: write the results as JSON to this path")
+    parser.add_argument('--workdir', help="sections, store: where to put the generated CSV and store")
+    parser.add_argument('--sql', action='store_true', help="sections: also time the KPIs on the DuckDB backend")
+    args = parser.parse_args()
+
+    if args.suite == 'sections':
+        records = []
+        for rows in args.rows or SECTION_SIZES:
+            for result in bench_sections(rows, args.seed, args.workdir, args.sql):
+                records.append(result)
+                label = ' '.join(str(result[key]) for key in ('selection', 'section', 'chart') if key in result)
+                payload = f"  {result['json_bytes'] / 1024:9.1f} KiB" if 'json_bytes' in result else ''
+                print(f"{rows:>12,} rows  {result['stage']:<16} {label:<44} {result['wall_s'] * 1000:9.1f}ms  "
+                      f"peak {result['peak_bytes'] / 2**20:8.1f} MiB{payload}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'seed': args.seed, 'day': str(BENCHMARK_DAY), 'environment': environment(),
+                           'results': records}, f, indent=1)
+        return
+
+    for rows in args.rows or [1_000_000, 10_000_000]:
+        if args.suite == 'kde':
+            result = bench_kde(rows, args.repeat)
+            print(f"{result['rows']:>12,} rows  binned {result['binned_s'] * 1000:8.1f}ms  "
+                  f"gaussian_kde {result['gaussian_kde_s'] * 1000:9.1f}ms "
+                  f"(on {result['gaussian_kde_rows']:,} rows)  max rel. error {result['max_relative_error']:.1e}")
+            continue
+        if args.suite == 'store':
+            result = bench_store(rows, args.seed, args.workdir)
+            print(f"{result['rows']:>12,} rows  CSV {result['csv_bytes'] / 2**20:.0f} MiB  "
+                  f"store {result['store_bytes'] / 2**20:.0f} MiB in {result['batches']} batch(es)  "
+                  f"build {result['build_s']:.1f}s  read {result['read_s'] * 1000:.1f}ms  "
+                  f"copied {result['copied_bytes'] / 2**20:.1f} MiB")
+            continue
+        if args.suite == 'cube':
+            result = bench_cube(rows, args.repeat)
+            print(f"{result['rows']:>12,} rows  {result['cells']:,} cells  {result['cube_bytes'] / 2**20:.1f} MiB  "
+                  f"build {result['build_s'] * 1000:8.1f}ms (peak {result['build_peak_bytes'] / 2**20:.1f} MiB)  "
+                  f"KPIs rows {result['rows_kpis_s'] * 1000:.2f}ms  cube {result['cube_kpis_s'] * 1000:.2f}ms")
+            continue
+        result = bench_filters(rows, args.repeat)
+        print(f"{result['rows']:>12,} rows  build {result['index_build_s']:.3f}s  "
+              f"isin {result['isin_chain_s'] * 1000:8.1f}ms  "
+              f"bitmap {result['bitmap_s'] * 1000:8.1f}ms  "
+              f"(mask only {result['bitmap_mask_s'] * 1000:.1f}ms)  "
+              f"-> {result['selected_rows']:,} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Figure builders whose Plotly payload stays bounded regardless of row count."""
+import math
+
+import numpy as np
+import pandas as pd
+
+OTHER_LABEL = 'Other'
+# Above this many rows scatters are binned instead of plotted point by point.
+RAW_POINTS_LIMIT = 5000
+SCATTER_BINS = 100
+
+
+def rollup_top_n(data, dimension, values, top_n=15, page=0, sort_by=None):
+    """Sum `values` per `dimension`, keep one page of the top groups and fold the rest into "Other".
+
+    Returns the rolled-up frame and the number of pages available.
+    """
+    grouped = data.groupby(dimension, observed=True)[values].sum()
+    return page_rollup(grouped, dimension, values, top_n, page, sort_by)
+
+
+def page_rollup(grouped, dimension, values, top_n=15, page=0, sort_by=None):
+    """The paging half of `rollup_top_n`, for `values` already summed per `dimension`."""
+    grouped = grouped.sort_values(sort_by or values[0], ascending=False)
+    grouped.index = grouped.index.astype(str)
+    pages = max(1, math.ceil(len(grouped) / top_n))
+    page = min(max(page, 0), pages - 1)
+    shown = grouped.iloc[page * top_n:(page + 1) * top_n]
+    rest = grouped.drop(shown.index)
+    if not rest.empty:
+        shown = pd.concat([shown, rest.sum().to_frame(OTHER_LABEL).T])
+    shown.index.name = dimension
+    return shown.reset_index(), pages
+
+
+def thermometer_chart(rollup, dimension):
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=rollup[dimension], y=rollup['Count'], name="Count", marker_color="green",
+                         text=rollup['Count'], textposition="outside"))
+    fig.add_trace(go.Bar(x=rollup[dimension], y=rollup['Reorder Level'], name="Reorder Level", marker_color="red",
+                         opacity=0.6, text=rollup['Reorder Level'], textposition="outside"))
+    fig.update_layout(title="Thermometer Chart: Count vs Reorder Level", xaxis_title=dimension,
+                      yaxis_title="Count", barmode="overlay", template="plotly_white", legend=dict(title="Metrics"))
+    return fig
+
+
+def box_stats(data, value, group=None):
+    """Quartiles, Tukey whiskers and mean of `value`, per `group` if given."""
+    values = data[value]
+    keys = data[group] if group is not None else pd.Series(value, index=data.index)
+    grouped = values.groupby(keys, observed=True)
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+    stats['mean'] = grouped.mean()
+    iqr = stats['q3'] - stats['q1']
+    low = keys.map(stats['q1'] - 1.5 * iqr).astype(float)
+    high = keys.map(stats['q3'] + 1.5 * iqr).astype(float)
+    inside = values.where((values >= low) & (values <= high)).groupby(keys, observed=True)
+    stats['lowerfence'] = inside.min()
+    stats['upperfence'] = inside.max()
+    stats.index = stats.index.astype(str)
+    stats.index.name = group or value
+    return stats.reset_index()
+
+
+def box_chart(stats, value, group=None, title=None, colors=None):
+    """Box plot drawn from precomputed `box_stats`, one trace per group."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for i, row in enumerate(stats.itertuples(index=False)):
+        name = row[0]
+        fig.add_trace(go.Box(
+            name=name, x=[name] if group is not None else None,
+            q1=[row.q1], median=[row.median], q3=[row.q3], mean=[row.mean],
+            lowerfence=[row.lowerfence], upperfence=[row.upperfence],
+            marker_color=colors[i % len(colors)] if colors else None,
+        ))
+    fig.update_layout(title=title, xaxis_title=group, yaxis_title=value, showlegend=group is not None,
+                      legend=dict(title=group) if group is not None else None)
+    return fig
+
+
+def binned_scatter(data, x, y, size, color, bins=SCATTER_BINS):
+    """Collapse points onto a `bins` x `bins` grid per color, datashader style.
+
+    Each occupied cell becomes one point at the cell's mean position, sized by the
+    summed `size` and carrying the number of rows it stands for.
+    """
+    def bin_codes(column):
+        low, high = data[column].min(), data[column].max()
+        span = (high - low) or 1
+        return ((data[column] - low) / span * (bins - 1)).round().astype('int32')
+
+    cells = data[[x, y, size]].assign(**{color: data[color].astype(str), '_xbin': bin_codes(x), '_ybin': bin_codes(y)})
+    binned = cells.groupby([color, '_xbin', '_ybin'], observed=True).agg(
+        **{x: (x, 'mean'), y: (y, 'mean'), size: (size, 'sum'), 'Rows': (x, 'size')})
+    return binned.reset_index().drop(columns=['_xbin', '_ybin'])
+
+
+def scatter_points(data, x, y, size, color, max_points=RAW_POINTS_LIMIT):
+    """Raw rows when there are few enough of them, otherwise the binned grid."""
+    if len(data) <= max_points:
+        return data[[x, y, size, color]].assign(**{color: data[color].astype(str)})
+    return binned_scatter(data, x, y, size, color)
+
+
+def scatter_chart(points, x, y, size, color, title=None, max_marker=40):
+    """WebGL scatter of `points` with marker area proportional to `size`."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    sizeref = 2.0 * max(points[size].max(), 1) / max_marker ** 2
+    for name, group in points.groupby(color, observed=True, sort=True):
+        fig.add_trace(go.Scattergl(
+            x=group[x], y=group[y], mode='markers', name=str(name),
+            marker=dict(size=group[size], sizemode='area', sizeref=sizeref, sizemin=2),
+            customdata=group[['Rows']] if 'Rows' in group else None,
+            hovertemplate=f"{x}=%{{x}}<br>{y}=%{{y}}" + ("<br>Rows=%{customdata[0]}" if 'Rows' in group else "")
+                          + f"<extra>{name}</extra>",
+        ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y, legend=dict(title=color))
+    return fig
+
+
+def hierarchy_sums(data, path, values, color=None):
+    """Sum `values` over the `path` levels; `color` becomes its `values`-weighted mean, as Plotly Express computes it."""
+    columns = {values: data[values]}
+    if color is not None:
+        columns['_weighted'] = data[color] * data[values]
+    sums = pd.DataFrame(columns).groupby([data[level] for level in path], observed=True).sum()
+    if color is not None:
+        sums[color] = sums.pop('_weighted') / sums[values]
+    return sums.reset_index()
+
+
+def binned_kde(values, points=1000, max_bins=4096, weights=None):
+    """Gaussian KDE of `values` on `points` evenly spaced x values between their min and max.
+
+    Matches scipy's gaussian_kde (Scott's rule bandwidth) but bins the data onto at
+    most `max_bins` grid points and convolves the counts with the kernel by FFT, so
+    the cost after one pass over the data no longer depends on row count. Integer
+    data is counted exactly with one bin per value. `weights` gives each value a
+    repeat count, e.g. distinct values and their frequencies from a GROUP BY.
+    """
+    values = np.asarray(values)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+    n = weights.sum()
+    low, high = values.min(), values.max()
+    if n > 1:
+        mean = np.average(values, weights=weights)
+        bandwidth = np.sqrt(np.sum(weights * (values - mean) ** 2) / (n - 1)) * n ** (-1 / 5)
+    else:
+        bandwidth = 0.0
+    if not bandwidth:
+        bandwidth = 1.0
+
+    span = float(high - low)
+    # At least four grid points per bandwidth so interpolating the grid stays accurate.
+    bins = int(min(max_bins, max(span + 1, np.ceil(4 * span / bandwidth) + 1))) if span else 1
+    step = span / (bins - 1) if bins > 1 else 1.0
+    if np.issubdtype(values.dtype, np.integer) and bins == span + 1:
+        counts = np.bincount(values - low, weights, minlength=bins)
+    else:
+        position = (values - low) / step
+        left = np.clip(np.floor(position).astype(np.int64), 0, max(bins - 2, 0))
+        right_weight = position - left
+        counts = np.bincount(left, weights * (1 - right_weight), bins)
+        if bins > 1:
+            counts += np.bincount(left + 1, weights * right_weight, bins)
+
+    reach = int(min(bins - 1, np.ceil(4 * bandwidth / step)))
+    offsets = np.arange(-reach, reach + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    size = bins + 2 * reach
+    density = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)[reach:reach + bins] / n
+
+    grid = low + np.arange(bins) * step
+    x_vals = np.linspace(low, high, points)
+    return x_vals, np.interp(x_vals, grid, np.maximum(density, 0))
@@ -0,0 +1,146 @@
+"""Client-side cross-filtering of a small filtered view.
+
+pack_view turns the view into a compact columnar payload: each filter
+dimension as a dictionary (its labels) plus one byte (or two) of code per row,
+each measure as little-endian float32, base64-encoded. Those are the buffers an
+Arrow dictionary/float column holds, which typed arrays read in place.
+client_view_html wraps it in a self-contained page whose script re-filters and
+re-aggregates the KPIs and bar charts in the browser on every filter change,
+so those interactions never reach the server.
+
+The page is a separate explorer embedded below the dashboard filters, with
+its own filters, KPIs and bar charts. The dashboard's filters and plotly charts
+are Streamlit widgets, whose every change reruns the script, so they still
+filter on the server.
+"""
+import base64
+import html
+import json
+
+import numpy as np
+import pandas as pd
+
+from filters import FILTER_COLUMNS
+
+# Views up to this many rows are shipped to the browser, at about 28 bytes a row.
+CLIENT_VIEW_MAX_ROWS = 50_000
+CLIENT_MEASURES = ['Count', 'Units Sold', 'Total Revenue', 'Profit']
+# (measure, dimension) of each bar chart.
+CLIENT_CHARTS = [
+    ('Total Revenue', 'Category'),
+    ('Units Sold', 'Dosage Form'),
+    ('Count', 'Warehouse Location'),
+    ('Profit', 'Supplier Name'),
+    ('Units Sold', 'Target Ailment'),
+]
+CLIENT_VIEW_COLUMNS = FILTER_COLUMNS + CLIENT_MEASURES
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><style>
+body { font-family: "Source Sans Pro", sans-serif; margin: 0; color: #31333f; }
+.filters, .kpis, .charts { display: grid; gap: 12px; margin-bottom: 12px; }
+.filters { grid-template-columns: repeat(5, 1fr); }
+.kpis { grid-template-columns: repeat(5, 1fr); }
+.charts { grid-template-columns: repeat(auto-fill, minmax(320px, 1fr)); }
+label { font-size: 13px; display: block; margin-bottom: 4px; }
+select { width: 100%; font-size: 13px; }
+.kpi { border: 1px solid #d6d6d9; border-radius: 8px; padding: 8px 12px; }
+.kpi .name { font-size: 13px; } .kpi .value { font-size: 24px; }
+.chart h4 { margin: 4px 0; font-size: 14px; }
+.bar { display: flex; align-items: center; font-size: 12px; margin: 2px 0; }
+.bar .label { width: 35%; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }
+.bar .fill { background: #1f77b4; height: 14px; margin-right: 6px; }
+.caption { font-size: 12px; color: #808495; margin-bottom: 8px; }
+</style></head><body>
+<div class="caption">__TITLE__ (hold Ctrl/Cmd to choose several values)</div>
+<div class="filters" id="filters"></div>
+<div class="kpis" id="kpis"></div>
+<div class="charts" id="charts"></div>
+<script type="application/json" id="payload">__PAYLOAD__</script>
+<script>
+const payload = JSON.parse(document.getElementById("payload").textContent);
+function decode(text, Type) {
+  const binary = atob(text), bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  return new Type(bytes.buffer);
+}
+const dimensions = payload.dimensions.map(d => ({...d, codes: decode(d.codes, d.bytes === 1 ? Uint8Array : Uint16Array)}));
+const measures = Object.fromEntries(payload.measures.map(m => [m.name, decode(m.values, Float32Array)]));
+const escape = text => text.replace(/[&<>"']/g, c => `&#${c.charCodeAt(0)};`);
+const format = v => Math.abs(v) >= 1e6 ? (v / 1e6).toFixed(2) + "M" : Math.round(v).toLocaleString();
+
+const selects = dimensions.map(d => {
+  const cell = document.createElement("div"), label = document.createElement("label"), select = document.createElement("select");
+  label.textContent = d.name;
+  select.multiple = true;
+  select.size = 4;
+  d.labels.forEach((text, code) => select.add(new Option(text, code)));
+  select.addEventListener("change", update);
+  cell.append(label, select);
+  document.getElementById("filters").append(cell);
+  return select;
+});
+
+function update() {
+  // allowed[d][code] is 1 when the code passes dimension d's filter; null means no filter.
+  const allowed = dimensions.map((d, i) => {
+    const chosen = [...selects[i].selectedOptions].map(o => +o.value);
+    if (!chosen.length) return null;
+    const table = new Uint8Array(d.bytes === 1 ? 256 : 65536);
+    chosen.forEach(code => table[code] = 1);
+    return table;
+  });
+  const active = dimensions.map((d, i) => [d.codes, allowed[i]]).filter(([, table]) => table);
+  const totals = Object.fromEntries(payload.measures.map(m => [m.name, 0]));
+  const groups = payload.charts.map(c => new Float64Array(dimensions.find(d => d.name === c.dimension).labels.length));
+  const chartColumns = payload.charts.map(c => [dimensions.find(d => d.name === c.dimension).codes, measures[c.measure]]);
+  let rows = 0;
+  for (let r = 0; r < payload.rows; r++) {
+    let keep = true;
+    for (const [codes, table] of active) if (!table[codes[r]]) { keep = false; break; }
+    if (!keep) continue;
+    rows++;
+    for (const name in totals) { const v = measures[name][r]; if (v === v) totals[name] += v; }
+    chartColumns.forEach(([codes, values], c) => { const v = values[r]; if (v === v && codes[r] < groups[c].length) groups[c][codes[r]] += v; });
+  }
+  const kpis = [["Rows", rows], ...Object.entries(totals)];
+  document.getElementById("kpis").innerHTML = kpis.map(([name, value]) =>
+    `<div class="kpi"><div class="name">${name}</div><div class="value">${format(value)}</div></div>`).join("");
+  document.getElementById("charts").innerHTML = payload.charts.map((c, i) => {
+    const labels = dimensions.find(d => d.name === c.dimension).labels;
+    const peak = Math.max(...groups[i].map(Math.abs), 1e-9);
+    const bars = [...groups[i]].map((v, code) => [labels[code], v]).filter(([, v]) => v !== 0).sort((a, b) => b[1] - a[1])
+      .map(([label, v]) => `<div class="bar"><span class="label" title="${escape(label)}">${escape(label)}</span>` +
+           `<span class="fill" style="width:${(45 * Math.abs(v) / peak).toFixed(1)}%"></span>${format(v)}</div>`).join("");
+    return `<div class="chart"><h4>${c.measure} by ${c.dimension}</h4>${bars}</div>`;
+  }).join("");
+}
+update();
+</script></body></html>
+"""
+
+
+def _encode(values):
+    return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode('ascii')
+
+
+def pack_view(data, dimensions=FILTER_COLUMNS, measures=CLIENT_MEASURES):
+    """JSON-ready columnar payload of `data`; a missing dimension value gets the code's largest value."""
+    payload = {'rows': len(data), 'dimensions': [], 'measures': []}
+    for column in dimensions:
+        codes, labels = pd.factorize(data[column], sort=True)
+        dtype = np.dtype('<u1') if len(labels) < 255 else np.dtype('<u2')
+        codes = np.where(codes < 0, np.iinfo(dtype).max, codes).astype(dtype)
+        payload['dimensions'].append({'name': column, 'labels': [str(label) for label in labels],
+                                      'bytes': dtype.itemsize, 'codes': _encode(codes)})
+    for column in measures:
+        values = data[column].to_numpy(dtype=np.float64, na_value=np.nan).astype('<f4')
+        payload['measures'].append({'name': column, 'values': _encode(values)})
+    return payload
+
+
+def client_view_html(payload, charts=CLIENT_CHARTS):
+    data = json.dumps({**payload, 'charts': [{'measure': m, 'dimension': d} for m, d in charts]})
+    # Keep "</script>" inside the JSON from closing the script element.
+    return PAGE.replace('__PAYLOAD__', data.replace('</', '<\\/')).replace('__TITLE__', html.escape(
+        f"{payload['rows']:,} rows filtered in your browser"))
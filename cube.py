@@ -0,0 +1,205 @@
+"""Pre-aggregated cube over the filter dimensions.
+
+Rows are bucketed into cells, one per combination of filter values and
+medicine that occurs in the data. Each cell keeps mergeable partial aggregates
+for every measure (sum, non-null count and sum of squares). A filter selection is answered by rolling up the cells it covers, so KPI cost
+and memory depend on the number of cells, never more than the number of rows.
+"""
+import copy
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from filters import FILTER_COLUMNS
+from ranking import top_groups
+
+CUBE_MEASURES = [
+    'Count', 'Units Sold', 'Total Revenue', 'Total Cost', 'Profit', 'Cost Price ($)', 'Selling Price ($)',
+    'Discount (%)', 'Profit Margin (%)', 'Prescription Required', 'Expiry Date',
+]
+# Cells are split per medicine too, so distinct medicines and per-medicine totals are exact.
+GROUP_COLUMN = 'Medicine Name'
+
+
+def _measure(data, column):
+    values = data[column]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        # Dates are aggregated as days since the epoch.
+        return values.to_numpy(dtype='datetime64[D]').astype(np.float64)
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class InventoryCube:
+    def __init__(self, data, dimensions=FILTER_COLUMNS, measures=CUBE_MEASURES):
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+        self.categories = {column: data[column].cat.categories for column in self.dimensions + [GROUP_COLUMN]}
+        # Sums of these come back as ints, as they would from the frame.
+        self.integer = {column for column in self.measures
+                        if pd.api.types.is_integer_dtype(data[column]) or pd.api.types.is_bool_dtype(data[column])}
+        # One extra slot per axis collects rows whose value is missing.
+        self.shape = tuple(len(self.categories[column]) + 1 for column in self.dimensions + [GROUP_COLUMN])
+        # Cells present, by their sorted position in the full (dense) grid, and their per-axis codes.
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.coordinates = np.zeros((len(self.shape), 0), dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros((len(self.measures), 0))
+        self.counts = np.zeros((len(self.measures), 0), dtype=np.int64)
+        self.squares = np.zeros((len(self.measures), 0))
+        self.add(data)
+
+    def copy(self):
+        """An independent cube, to add() to or remove() from while this one stays in use."""
+        cube = copy.copy(self)
+        cube.rows, cube.sums, cube.counts, cube.squares = (
+            values.copy() for values in (self.rows, self.sums, self.counts, self.squares))
+        return cube
+
+    def covers(self, data):
+        """Whether every cube axis of `data` has the categories the cube was built with."""
+        return all(data[column].cat.categories.equals(categories) for column, categories in self.categories.items())
+
+    def _keys(self, data):
+        codes = []
+        for column, size in zip(self.categories, self.shape):
+            column_codes = data[column].cat.codes.to_numpy().astype(np.int64)
+            codes.append(np.where(column_codes < 0, size - 1, column_codes))
+        return np.ravel_multi_index(codes, self.shape)
+
+    def _extend(self, keys):
+        """Make room for the cells in `keys` the cube does not hold yet."""
+        new = np.setdiff1d(keys, self.keys, assume_unique=True)
+        if not len(new):
+            return
+        keys = np.union1d(self.keys, new)
+        old = np.searchsorted(keys, self.keys)
+
+        def grow(values):
+            grown = np.zeros(values.shape[:-1] + (len(keys),), dtype=values.dtype)
+            grown[..., old] = values
+            return grown
+
+        self.rows, self.sums, self.counts, self.squares = map(grow, (self.rows, self.sums, self.counts, self.squares))
+        self.keys = keys
+        self.coordinates = np.array(np.unravel_index(keys, self.shape))
+
+    def add(self, data, sign=1):
+        keys = self._keys(data)
+        if sign > 0:
+            self._extend(np.unique(keys))
+        cells = np.searchsorted(self.keys, keys)
+        size = len(self.keys)
+        self.rows += sign * np.bincount(cells, minlength=size)
+        for i, column in enumerate(self.measures):
+            values = _measure(data, column)
+            present = ~np.isnan(values)
+            values = np.where(present, values, 0.0)
+            self.sums[i] += sign * np.bincount(cells, weights=values, minlength=size)
+            self.counts[i] += sign * np.bincount(cells, weights=present, minlength=size).astype(np.int64)
+            self.squares[i] += sign * np.bincount(cells, weights=values * values, minlength=size)
+
+    def remove(self, data):
+        """Take rows back out of their cells."""
+        self.add(data, sign=-1)
+
+    def slice(self, selection, today=None, rows=None):
+        """Roll-up view of the cells matching `selection` ({column: [values]}).
+
+        `rows`, a query over the selected rows (e.g. queries.FrameQuery), answers
+        whatever the cells cannot: top rows, chart aggregates, group totals over
+        columns that are not cube axes.
+        """
+        axes = []
+        for column, size in zip(self.categories, self.shape):
+            chosen = selection.get(column)
+            if chosen:
+                positions = self.categories[column].get_indexer(pd.Index(list(chosen)))
+                axis = np.zeros(size, dtype=bool)
+                axis[positions[positions >= 0]] = True
+            else:
+                axis = None
+            axes.append(axis)
+        return CubeSlice(self, axes, today, rows)
+
+
+class CubeSlice:
+    """A queries.FrameQuery look-alike answered from cube cells where it can."""
+
+    def __init__(self, cube, axes, today=None, rows=None):
+        self.cube = cube
+        self.axes = axes
+        self.rows = rows
+        self.today = np.datetime64(today or datetime.date.today(), 'D')
+        # axes[i] says which codes of axis i are selected; None selects them all.
+        mask = cube.rows > 0
+        for axis, coordinates in zip(axes, cube.coordinates):
+            if axis is not None:
+                mask &= axis[coordinates]
+        self.cells = np.flatnonzero(mask)
+
+    def __getattr__(self, name):
+        if name == 'rows' or self.rows is None:
+            raise AttributeError(name)
+        return getattr(self.rows, name)
+
+    def _index(self, column):
+        if column == 'Days to Expiry':
+            return self.cube.measures.index('Expiry Date'), -float(self.today.astype(np.int64))
+        return self.cube.measures.index(column), 0.0
+
+    def count(self):
+        return int(self.cube.rows[self.cells].sum())
+
+    def sum(self, column):
+        i, offset = self._index(column)
+        total = self.cube.sums[i, self.cells].sum() + offset * self.cube.counts[i, self.cells].sum()
+        return int(round(total)) if column in self.cube.integer else total
+
+    def mean(self, column):
+        i, offset = self._index(column)
+        counted = self.cube.counts[i, self.cells].sum()
+        return self.cube.sums[i, self.cells].sum() / counted + offset if counted else np.nan
+
+    def std(self, column):
+        # Shift-invariant, so Days to Expiry needs no offset.
+        i, _ = self._index(column)
+        counted = self.cube.counts[i, self.cells].sum()
+        if counted < 2:
+            return np.nan
+        mean = self.cube.sums[i, self.cells].sum() / counted
+        variance = (self.cube.squares[i, self.cells].sum() - counted * mean * mean) / (counted - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def _by(self, values, column):
+        axis = list(self.cube.categories).index(column)
+        coordinates = self.cube.coordinates[axis, self.cells]
+        size = self.cube.shape[axis]
+        totals = np.bincount(coordinates, weights=values, minlength=size)[:-1]
+        present = np.bincount(coordinates, weights=self.cube.rows[self.cells], minlength=size)[:-1] > 0
+        return pd.Series(totals[present], index=pd.Index(self.cube.categories[column][present], name=column))
+
+    def sum_by(self, column, by):
+        if by not in self.cube.categories:
+            return self.rows.sum_by(column, by)
+        i, offset = self._index(column)
+        values = self.cube.sums[i, self.cells] + offset * self.cube.counts[i, self.cells]
+        totals = self._by(values, by).rename(column)
+        return totals.round().astype(np.int64) if column in self.cube.integer else totals
+
+    def top_by(self, column, by, k):
+        return top_groups(self.sum_by(column, by), k)
+
+    def mean_by(self, column, by):
+        if by not in self.cube.categories:
+            return self.rows.mean_by(column, by)
+        i, _ = self._index(column)
+        counted = self._by(self.cube.counts[i, self.cells].astype(np.float64), by)
+        return (self.sum_by(column, by) / counted.replace(0, np.nan)).rename(column)
+
+    def nunique(self, column):
+        if column in self.cube.categories:
+            return int(self._by(self.cube.rows[self.cells].astype(np.float64), column).shape[0])
+        if self.rows is None:
+            raise KeyError(f"the cube keeps no distinct count for {column!r}")
+        return self.rows.nunique(column)
@@ -0,0 +1,361 @@
+"""On-disk columnar store for the inventory dataset.
+
+The source CSV is parsed once into an uncompressed Feather (Arrow IPC) file that
+already carries the derived financial columns. Later loads memory-map that file
+and only rebuild it when the source CSV changes.
+
+The CSV is streamed in chunks, so building the store never holds more than a
+few chunks, or one whole column, in memory, however large the export:
+
+    python data_store.py --chunk-mb 16 --workers 4
+"""
+import argparse
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+SOURCE_PATH = 'enhanced_medicine_inventory_dataset.csv'
+STORE_PATH = 'enhanced_medicine_inventory_dataset.feather'
+SOURCE_ENCODING = 'cp1252'
+DATE_COLUMNS = ['Expiry Date', 'Manufacture Date']
+# Low-cardinality text columns, stored as dictionary codes plus a lookup table.
+CATEGORICAL_COLUMNS = [
+    'Medicine Name', 'Category', 'Dosage Form', 'Strength', 'Storage Temperature',
+    'Supplier Name', 'Warehouse Location', 'Usage Instructions', 'Target Ailment',
+]
+# Near-unique identifiers, kept as contiguous Arrow strings instead of Python objects.
+IDENTIFIER_COLUMNS = ['Batch Number', 'Regulatory Approval Number']
+INTEGER_COLUMNS = ['Count', 'Reorder Level', 'Discount (%)', 'Days to Expiry', 'Units Sold']
+# Explicit types for the streaming parser, so every chunk comes out with the same schema.
+# Integer columns are parsed as floats, which also accepts '294.0' and blanks; they
+# are stored as int64 only when the whole file holds whole numbers, as pandas infers.
+SOURCE_TYPES = {
+    **{column: pa.string() for column in CATEGORICAL_COLUMNS + IDENTIFIER_COLUMNS},
+    **{column: pa.float64() for column in INTEGER_COLUMNS},
+    **{column: pa.float64() for column in ['Cost Price ($)', 'Selling Price ($)', 'Profit Margin (%)']},
+    **{column: pa.timestamp('us') for column in DATE_COLUMNS},
+    'Prescription Required': pa.bool_(),
+}
+DATE_FORMATS = [pacsv.ISO8601, '%m/%d/%Y']
+# Bytes of CSV parsed per chunk.
+CHUNK_BYTES = 16 << 20
+
+
+def _meta_path(store_path):
+    return store_path + '.meta.json'
+
+
+def file_sha1(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_signature(csv_path=SOURCE_PATH):
+    stat = os.stat(csv_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def dataset_version(csv_path=SOURCE_PATH):
+    """Cheap token that changes whenever the source CSV is rewritten."""
+    signature = source_signature(csv_path)
+    return f"{signature['mtime_ns']}-{signature['size']}"
+
+
+def add_derived_columns(data):
+    data['Total Cost'] = data['Cost Price ($)'] * data['Units Sold']
+    data['Total Revenue'] = data['Selling Price ($)'] * data['Units Sold']
+    data['Profit'] = data['Total Revenue'] - data['Total Cost']
+    data['Total Profit Margin (%)'] = (data['Profit'] / data['Total Revenue']) * 100
+    data['Cost Efficiency (%)'] = (data['Total Cost'] / data['Total Revenue']) * 100
+    data['Stock Gap'] = data['Reorder Level'] - data['Count']
+    return data
+
+
+def apply_schema(data):
+    for column in CATEGORICAL_COLUMNS:
+        data[column] = data[column].astype('category')
+    for column in IDENTIFIER_COLUMNS:
+        data[column] = data[column].astype('string[pyarrow]')
+    return data
+
+
+def filter_options(data, column):
+    """Selectable values for a categorical column, straight from its dictionary."""
+    return data[column].cat.categories.tolist()
+
+
+def read_source(csv_path=SOURCE_PATH):
+    data = pd.read_csv(csv_path, encoding=SOURCE_ENCODING)
+    for column in DATE_COLUMNS:
+        data[column] = pd.to_datetime(data[column])
+    return data
+
+
+def read_meta(store_path=STORE_PATH):
+    try:
+        with open(_meta_path(store_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(store_path, meta):
+    tmp_path = f"{_meta_path(store_path)}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _meta_path(store_path))
+
+
+def store_is_fresh(csv_path=SOURCE_PATH, store_path=STORE_PATH):
+    meta = read_meta(store_path)
+    if meta is None or not os.path.exists(store_path):
+        return False
+    signature = source_signature(csv_path)
+    if signature['mtime_ns'] == meta['mtime_ns'] and signature['size'] == meta['size']:
+        return True
+    # The file was touched or copied; only rebuild if the content really changed.
+    if signature['size'] != meta['size'] or file_sha1(csv_path) != meta['sha1']:
+        return False
+    _write_meta(store_path, {**meta, **signature})
+    return True
+
+
+def write_store(data, store_path, meta):
+    tmp_path = f"{store_path}.{os.getpid()}.tmp"
+    # Uncompressed and in a single record batch, so every column can be mapped
+    # straight into pandas without a decode or concatenation copy.
+    table = pa.Table.from_pandas(data, preserve_index=False).combine_chunks()
+    feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(len(data), 1))
+    os.replace(tmp_path, store_path)
+    _write_meta(store_path, meta)
+
+
+def source_blocks(csv_path=SOURCE_PATH, chunk_bytes=CHUNK_BYTES):
+    """Yield (header, block, end offset) with blocks of about `chunk_bytes` raw CSV bytes, cut at line ends.
+
+    Like the source export, values must not contain line breaks.
+    """
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        while block := f.read(chunk_bytes):
+            block += f.readline()
+            yield header, block, f.tell()
+
+
+def parse_block(header, block, columns=None):
+    """Decode one block from SOURCE_ENCODING and parse it with the explicit SOURCE_TYPES."""
+    text = (header + block).decode(SOURCE_ENCODING).encode('utf-8')
+    return pacsv.read_csv(
+        pa.py_buffer(text),
+        read_options=pacsv.ReadOptions(block_size=len(text) + 1, use_threads=False),
+        convert_options=pacsv.ConvertOptions(column_types=SOURCE_TYPES, timestamp_parsers=DATE_FORMATS,
+                                             include_columns=columns),
+    )
+
+
+def _in_order(task, items, workers):
+    """Run `task(*item)` for each item on `workers` threads, yielding (item, result) in input order.
+
+    A sliding window keeps at most 2 * `workers` results in memory.
+    """
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        pending = collections.deque()
+        for item in items:
+            pending.append((item, pool.submit(task, *item)))
+            if len(pending) > 2 * workers:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+
+
+def _whole(values):
+    return values.null_count == 0 and pc.all(pc.equal(pc.floor(values), values)).as_py() is not False
+
+
+def scan_source(csv_path=SOURCE_PATH, chunk_bytes=CHUNK_BYTES, workers=1):
+    """(sorted distinct values of every categorical column, integer columns holding only whole numbers),
+    from a pass over just those columns."""
+    def scan(header, block, end):
+        table = parse_block(header, block, CATEGORICAL_COLUMNS + INTEGER_COLUMNS)
+        distinct = {column: pc.unique(table.column(column)).drop_null().to_pylist() for column in CATEGORICAL_COLUMNS}
+        return distinct, {column for column in INTEGER_COLUMNS if _whole(table.column(column))}
+
+    seen = {column: set() for column in CATEGORICAL_COLUMNS}
+    integers = set(INTEGER_COLUMNS)
+    for _, (values, whole) in _in_order(scan, source_blocks(csv_path, chunk_bytes), workers):
+        for column in CATEGORICAL_COLUMNS:
+            seen[column].update(values[column])
+        integers &= whole
+    return {column: pd.Index(sorted(values)) for column, values in seen.items()}, integers
+
+
+def convert_chunk(table, categories, integers=()):
+    """One parsed CSV chunk as a store frame: derived columns added, categoricals on the shared
+    dictionaries, the `integers` columns back to int64."""
+    data = table.drop_columns(CATEGORICAL_COLUMNS).to_pandas()
+    for column in integers:
+        data[column] = data[column].astype(np.int64)
+    for column in CATEGORICAL_COLUMNS:
+        codes = pc.index_in(table.column(column), value_set=pa.array(categories[column], pa.string()))
+        data[column] = pd.Categorical.from_codes(codes.fill_null(-1).to_numpy(), categories[column])
+    data = data[table.column_names]
+    for column in IDENTIFIER_COLUMNS:
+        data[column] = data[column].astype('string[pyarrow]')
+    return add_derived_columns(data)
+
+
+def _merge_batches(path, merged_path):
+    """Rewrite the IPC file at `path` as one record batch at `merged_path`, a column at a time.
+
+    Each column is concatenated into a file of its own and mapped back, so only
+    one column is ever held in memory; the final write copies every column
+    straight from its mapping.
+    """
+    table = ipc.open_file(pa.memory_map(path)).read_all()
+    column_paths = [f"{merged_path}.{i}" for i in range(table.num_columns)]
+    try:
+        columns = []
+        for field, column, column_path in zip(table.schema, table.columns, column_paths):
+            schema = pa.schema([field])
+            with ipc.new_file(column_path, schema) as writer:
+                writer.write_batch(pa.record_batch([column.combine_chunks()], schema=schema))
+            pa.default_memory_pool().release_unused()
+            columns.append(ipc.open_file(pa.memory_map(column_path)).get_batch(0).column(0))
+        with ipc.new_file(merged_path, table.schema) as writer:
+            writer.write_batch(pa.record_batch(columns, schema=table.schema))
+    finally:
+        columns = table = None
+        for column_path in column_paths:
+            if os.path.exists(column_path):
+                os.remove(column_path)
+
+
+def _write_chunks(chunks, store_path):
+    tmp_path = f"{store_path}.{os.getpid()}.tmp"
+    writer = schema = None
+    try:
+        for data in chunks:
+            table = pa.Table.from_pandas(data, schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = ipc.new_file(tmp_path, schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    # One batch per chunk would make read_store concatenate every column into memory.
+    with pa.memory_map(tmp_path) as source:
+        batches = ipc.open_file(source).num_record_batches
+    if batches > 1:
+        _merge_batches(tmp_path, tmp_path + '.single')
+        os.replace(tmp_path + '.single', tmp_path)
+    os.replace(tmp_path, store_path)
+
+
+def stream_source(csv_path=SOURCE_PATH, chunk_bytes=CHUNK_BYTES, workers=1, progress=None):
+    """Yield the CSV as store frames of about `chunk_bytes` of CSV each, in file order.
+
+    A first pass collects the categorical dictionaries so every chunk shares
+    them, and which integer columns can be int64. Blocks are decoded, parsed and converted on `workers` threads.
+    `progress(bytes_read, total_bytes, rows)` is called after each chunk.
+    """
+    categories, integers = scan_source(csv_path, chunk_bytes, max(workers, 1))
+    total_bytes = os.path.getsize(csv_path)
+    rows = 0
+
+    def convert(header, block, end):
+        return convert_chunk(parse_block(header, block), categories, integers)
+
+    for (_, _, end), data in _in_order(convert, source_blocks(csv_path, chunk_bytes), max(workers, 1)):
+        rows += len(data)
+        if progress is not None:
+            progress(end, total_bytes, rows)
+        yield data
+    if not rows:
+        with open(csv_path, 'rb') as f:
+            yield convert_chunk(parse_block(f.readline(), b''), categories, integers)
+
+
+def build_store(csv_path=SOURCE_PATH, store_path=STORE_PATH, chunk_bytes=CHUNK_BYTES, workers=1, progress=None):
+    """Stream the CSV into the store chunk by chunk, adding the derived columns as it goes."""
+    signature = source_signature(csv_path)
+    _write_chunks(stream_source(csv_path, chunk_bytes, workers, progress), store_path)
+    _write_meta(store_path, {**signature, 'sha1': file_sha1(csv_path)})
+
+
+def read_store(store_path=STORE_PATH):
+    """Read-only frame over the memory-mapped store.
+
+    Numeric, date and string columns are views on the mapped file, so every
+    session and worker process reading the same store shares one copy of them
+    through the OS page cache. Categorical codes and booleans are converted into
+    each process's own memory, about one byte per row per column (16 MiB for a
+    million rows; see `python benchmark.py store`).
+    """
+    table = feather.read_table(store_path, memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+def load_dataset(csv_path=SOURCE_PATH, store_path=STORE_PATH):
+    """Return the inventory frame, rebuilding the store only if the CSV changed."""
+    if not store_is_fresh(csv_path, store_path):
+        build_store(csv_path, store_path)
+    return read_store(store_path)
+
+
+def synthetic_frame(rows, seed=0, columns=None):
+    """Resample the bundled CSV to `rows` rows with fresh identifiers, as plain object columns."""
+    rng = np.random.default_rng(seed)
+    sample = add_derived_columns(read_source())
+    if columns is not None:
+        sample = sample[columns]
+    text_columns = [column for column in CATEGORICAL_COLUMNS if column in sample.columns]
+    sample[text_columns] = sample[text_columns].astype(object)
+    data = sample.iloc[rng.integers(0, len(sample), rows)].reset_index(drop=True)
+    if 'Batch Number' in data.columns:
+        data['Batch Number'] = pd.Series(rng.integers(0, 10**7, rows)).map('BATCH-{:07d}'.format).astype(object)
+    if 'Regulatory Approval Number' in data.columns:
+        data['Regulatory Approval Number'] = pd.Series(rng.integers(0, 10**8, rows)).map('FDA-{:08d}'.format).astype(object)
+    return data
+
+
+def schema_memory_report(rows, seed=0):
+    """Deep memory use of a synthetic frame of `rows` rows, before and after the schema."""
+    data = synthetic_frame(rows, seed)
+    before = data.memory_usage(deep=True).sum()
+    after = apply_schema(data).memory_usage(deep=True).sum()
+    return before, after
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the columnar inventory store.")
+    parser.add_argument('--memory-report', type=int, metavar='ROWS',
+                        help="print memory use before/after the schema on a synthetic frame")
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES >> 20, help="MiB of CSV parsed per chunk")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="threads parsing and converting chunks")
+    args = parser.parse_args()
+    if args.memory_report:
+        before, after = schema_memory_report(args.memory_report)
+        print(f"{args.memory_report:,} rows: {before / 2**20:,.1f} MiB -> {after / 2**20:,.1f} MiB")
+    else:
+        def report(done, total, rows):
+            print(f"\r{done / 2**20:,.1f} / {total / 2**20:,.1f} MiB, {rows:,} rows", end='', file=sys.stderr)
+
+        build_store(chunk_bytes=args.chunk_mb << 20, workers=args.workers, progress=report)
+        print(f"\nWrote {STORE_PATH}", file=sys.stderr)
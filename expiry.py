@@ -0,0 +1,87 @@
+"""Live Days to Expiry and a sorted expiry index for "expiring within N days" queries."""
+import copy
+import datetime
+
+import numpy as np
+
+
+def to_days(dates):
+    return np.array(dates, dtype='datetime64[D]')
+
+
+class ExpiryIndex:
+    """Row positions ordered by Expiry Date.
+
+    "Expiring within N days" is a searchsorted range query on the sorted dates.
+    The index is keyed on absolute dates, so a new day only shifts the query
+    bound and refreshes the cached Days to Expiry array; appended batches are
+    merged into the existing order instead of re-sorting everything.
+    """
+
+    def __init__(self, expiry_dates, today=None):
+        self.dates = to_days(expiry_dates)
+        self.order = np.argsort(self.dates, kind='stable')
+        self.sorted_dates = self.dates[self.order]
+        self.today = None
+        self.roll_to(today or datetime.date.today())
+
+    def __len__(self):
+        return len(self.dates)
+
+    def roll_to(self, today):
+        """Move the index to `today`; returns True if the date changed."""
+        today = np.datetime64(today, 'D')
+        if today == self.today:
+            return False
+        self.today = today
+        self._days = (self.dates - today).astype(np.int64)
+        return True
+
+    def days_to_expiry(self):
+        return self._days
+
+    def expiring_within(self, days):
+        """Positions of rows with Days to Expiry <= `days`, soonest first (already expired included)."""
+        end = np.searchsorted(self.sorted_dates, self.today + np.timedelta64(days, 'D'), side='right')
+        return self.order[:end]
+
+    def expiring_between(self, first_day, last_day):
+        """Positions of rows with `first_day` <= Days to Expiry <= `last_day`, soonest first."""
+        start = np.searchsorted(self.sorted_dates, self.today + np.timedelta64(first_day, 'D'), side='left')
+        end = np.searchsorted(self.sorted_dates, self.today + np.timedelta64(last_day, 'D'), side='right')
+        return self.order[start:end]
+
+    def copy(self):
+        """An independent index, to update() or roll while this one stays in use."""
+        index = copy.copy(self)
+        # order and sorted_dates are only ever replaced, never written into.
+        index.dates = self.dates.copy()
+        index._days = self._days.copy()
+        return index
+
+    def append(self, expiry_dates):
+        """Add rows at the end of the frame, merging them into the sorted order."""
+        new_dates = to_days(expiry_dates)
+        new_order = np.argsort(new_dates, kind='stable')
+        new_sorted = new_dates[new_order]
+        slots = np.searchsorted(self.sorted_dates, new_sorted, side='right')
+        self.sorted_dates = np.insert(self.sorted_dates, slots, new_sorted)
+        self.order = np.insert(self.order, slots, new_order + len(self.dates))
+        self.dates = np.concatenate([self.dates, new_dates])
+        self._days = np.concatenate([self._days, (new_dates - self.today).astype(np.int64)])
+
+    def update(self, positions, expiry_dates):
+        """Change the expiry date of existing rows in place."""
+        positions = np.asarray(positions)
+        new_dates = to_days(expiry_dates)
+        if not len(positions):
+            return
+        keep = ~np.isin(self.order, positions)
+        self.order = self.order[keep]
+        self.sorted_dates = self.sorted_dates[keep]
+        self.dates[positions] = new_dates
+        self._days[positions] = (new_dates - self.today).astype(np.int64)
+        moved = np.argsort(new_dates, kind='stable')
+        slots = np.searchsorted(self.sorted_dates, new_dates[moved], side='right')
+        self.sorted_dates = np.insert(self.sorted_dates, slots, new_dates[moved])
+        self.order = np.insert(self.order, slots, positions[moved])
@@ -0,0 +1,120 @@
+"""Vectorized synthetic inventory generator.
+
+Columns are sampled with NumPy in fixed-size chunks. Each chunk draws from its
+own child of one SeedSequence, so the output for a given seed (and day) is the
+same no matter how many worker processes produce the chunks.
+"""
+import collections
+import datetime
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_store import SOURCE_ENCODING
+
+# Medicine-related lists for fake data
+MEDICINE_NAMES = [
+    "Paracetamol", "Amoxicillin", "Ibuprofen", "Cetirizine", "Metformin",
+    "Ranitidine", "Ciprofloxacin", "Omeprazole", "Insulin", "Aspirin"
+]
+CATEGORIES = ['Analgesic', 'Antibiotic', 'Antipyretic', 'Antidiabetic', 'Antacid', 'Antihistamine']
+DOSAGE_FORMS = ['Tablet', 'Capsule', 'Syrup', 'Injection', 'Ointment', 'Drops']
+STRENGTHS = ['250mg', '500mg', '10mg/ml', '100mg', '1g', '5ml']
+STORAGE_TEMPERATURES = ['Room Temperature', '2–8°C', 'Below 25°C']
+WAREHOUSES = ['Warehouse A', 'Warehouse B', 'Warehouse C']
+SUPPLIERS = ['Supplier X', 'Supplier Y', 'Supplier Z', 'Supplier W']
+USAGE_INSTRUCTIONS = ['Take after meals', 'Take before meals', 'Use as directed']
+TARGET_AILMENTS = ['Pain', 'Infection', 'Fever', 'Diabetes', 'Allergy', 'Acidity']
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+# Multiplier coprime with 10, so scrambling the row number is a bijection and batch numbers stay unique.
+_SCRAMBLE = 7_919
+
+
+def _choice(rng, values, rows):
+    return pd.Categorical.from_codes(rng.integers(0, len(values), rows), categories=values)
+
+
+def _identifiers(prefix, numbers, width):
+    return pd.Series(numbers).astype(str).str.zfill(width).radd(prefix).to_numpy()
+
+
+def generate_chunk(start, rows, seed_sequence, total_rows, today=None):
+    """Rows `start` to `start + rows` of a `total_rows` dataset, drawn from `seed_sequence`."""
+    rng = np.random.default_rng(seed_sequence)
+    today = np.datetime64(today or datetime.date.today(), 'D')
+    width = max(7, len(str(total_rows - 1)))
+    modulus = 10 ** width
+    row_numbers = np.arange(start, start + rows, dtype=np.int64)
+    expiry = today + rng.integers(0, 731, rows).astype('timedelta64[D]')
+    return pd.DataFrame({
+        'Medicine Name': _choice(rng, MEDICINE_NAMES, rows),
+        'Category': _choice(rng, CATEGORIES, rows),
+        'Dosage Form': _choice(rng, DOSAGE_FORMS, rows),
+        'Strength': _choice(rng, STRENGTHS, rows),
+        'Batch Number': _identifiers('BATCH-', (row_numbers * _SCRAMBLE + 12_345) % modulus, width),
+        'Count': rng.integers(10, 501, rows),
+        'Reorder Level': rng.integers(10, 51, rows),
+        'Cost Price ($)': rng.uniform(2, 250, rows).round(2),
+        'Selling Price ($)': rng.uniform(10, 600, rows).round(2),
+        'Profit Margin (%)': rng.uniform(5, 50, rows).round(2),
+        'Discount (%)': rng.integers(0, 31, rows),
+        'Expiry Date': expiry,
+        'Manufacture Date': today - rng.integers(0, 731, rows).astype('timedelta64[D]'),
+        'Storage Temperature': _choice(rng, STORAGE_TEMPERATURES, rows),
+        'Supplier Name': _choice(rng, SUPPLIERS, rows),
+        'Warehouse Location': _choice(rng, WAREHOUSES, rows),
+        'Regulatory Approval Number': _identifiers('FDA-', rng.integers(0, 10**8, rows), 8),
+        'Prescription Required': rng.integers(0, 2, rows).astype(bool),
+        # Days to Expiry must agree with Expiry Date
+        'Days to Expiry': (expiry - today).astype(np.int64),
+        'Units Sold': rng.integers(0, 101, rows),
+        'Usage Instructions': _choice(rng, USAGE_INSTRUCTIONS, rows),
+        'Target Ailment': _choice(rng, TARGET_AILMENTS, rows),
+    }, index=pd.RangeIndex(start, start + rows))
+
+
+def generate(rows, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, today=None):
+    """Yield the dataset as consecutive chunks, built across `workers` processes."""
+    today = today or datetime.date.today()
+    starts = range(0, rows, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [(start, min(chunk_size, rows - start), seeds[i], rows, today) for i, start in enumerate(starts)]
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield generate_chunk(*task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        # A sliding window keeps chunk order and bounds how many chunks sit in memory.
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(pool.apply_async(generate_chunk, task))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def write(path, rows, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, today=None):
+    """Stream the dataset to a CSV (in the encoding the dashboard reads) or Parquet file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    writer = None
+    try:
+        for i, chunk in enumerate(generate(rows, seed, chunk_size, workers, today)):
+            if path.endswith('.parquet'):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False,
+                             encoding=SOURCE_ENCODING)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,223 @@
+"""Plotly figures behind each dashboard section, built without Streamlit.
+
+Every builder takes a query over the filtered inventory (see queries.py) and
+its section metrics and returns a figure. Expensive aggregates go through
+`aggregate(name, compute)`, which the dashboard points at its query cache; by
+default they are computed directly. plotly.express is imported by the builders
+themselves, so loading this module does not pay for it until a chart is drawn;
+plotly and plotly.graph_objects are already loaded by Streamlit in the
+dashboard, and only deferred here for headless callers such as report.py.
+"""
+from charts import box_chart, scatter_chart, thermometer_chart
+from timeseries import TIMELINE_DATES, TIMELINE_MEASURES, TimeRollup
+
+THERMOMETER_DIMENSIONS = ['Medicine Name', 'Category', 'Dosage Form', 'Warehouse Location', 'Supplier Name']
+
+
+def _compute(name, compute):
+    return compute()
+
+
+def thermometer_rollup(query, dimension, page=1, aggregate=_compute):
+    """One (1-based) page of the Count vs Reorder Level rollup and the number of pages."""
+    return aggregate(('thermometer', dimension, page),
+                     lambda: query.rollup_top_n(dimension, ['Count', 'Reorder Level'], page=page - 1))
+
+
+def thermometer(query, metrics, aggregate=_compute, dimension=THERMOMETER_DIMENSIONS[0], page=1):
+    rollup, _ = thermometer_rollup(query, dimension, page, aggregate)
+    return thermometer_chart(rollup, dimension)
+
+
+def selling_price_box(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    stats = aggregate('selling_price_box', lambda: query.box_stats('Selling Price ($)', 'Category'))
+    return box_chart(stats, 'Selling Price ($)', 'Category', title="Distribution of Selling Price by Category",
+                     colors=px.colors.qualitative.Plotly)
+
+
+def profit_margin_box(query, metrics, aggregate=_compute):
+    stats = aggregate('profit_margin_box', lambda: query.box_stats('Profit Margin (%)'))
+    return box_chart(stats, 'Profit Margin (%)', title="Profit Margin Distribution")
+
+
+def revenue_sunburst(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    revenue_by_category = aggregate('revenue_sunburst',
+                                    lambda: query.hierarchy_sums(['Category'], 'Total Revenue', color='Profit'))
+    return px.sunburst(revenue_by_category, path=['Category'], values='Total Revenue', color='Profit',
+                       color_continuous_scale='RdBu', title="Financial Breakdown by Category")
+
+
+def avg_selling_price_bar(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    avg_selling_price = aggregate('avg_selling_price',
+        lambda: query.mean_by('Selling Price ($)', 'Category').reset_index())
+    return px.bar(avg_selling_price, x='Category', y='Selling Price ($)', title="Avg Selling Price by Category",
+                  color='Category')
+
+
+def revenue_profit_scatter(query, metrics, aggregate=_compute):
+    points = aggregate('revenue_profit_scatter',
+                       lambda: query.scatter_points('Total Revenue', 'Profit', 'Units Sold', 'Category'))
+    return scatter_chart(points, 'Total Revenue', 'Profit', 'Units Sold', 'Category', title="Revenue vs Profit")
+
+
+def profit_margin_treemap(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    tree = aggregate('profit_margin_treemap',
+                     lambda: query.hierarchy_sums(['Category', 'Medicine Name'], 'Profit Margin (%)'))
+    return px.treemap(tree, path=['Category', 'Medicine Name'], values='Profit Margin (%)',
+                      title="Profit Margin by Category")
+
+
+def top_sales_bar(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    return px.bar(metrics['top_sales'], x='Medicine Name', y='Units Sold', title="Top 10 Medicines by Sales")
+
+
+def dosage_form_pie(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    rows_by_dosage_form = aggregate('dosage_form_pie', lambda: query.value_counts('Dosage Form'))
+    return px.pie(rows_by_dosage_form, names='Dosage Form', values='count',
+                  title="Sales Distribution by Dosage Form", hole=0.4)
+
+
+def profit_margin_gauge(query, metrics, aggregate=_compute):
+    import plotly.graph_objects as go
+    # Speedometer (Gauge) Chart for Average Profit Margin
+    return go.Figure(go.Indicator(mode="gauge+number", value=metrics['avg_profit_margin'],
+        title={'text': "Average Profit Margin (%)"},
+        gauge={
+            'axis': {'range': [0, 100]},
+            'bar': {'color': "#4CAF50"},
+            'steps': [
+                {'range': [0, 50], 'color': '#FFCDD2'},
+                {'range': [50, 75], 'color': '#FFF9C4'},
+                {'range': [75, 100], 'color': '#C8E6C9'}
+            ],
+        }
+    ))
+
+
+def revenue_pie(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    return px.pie(metrics['revenue_by_category'], values='Total Revenue', names='Category',
+                  title="Revenue Distribution by Category", color_discrete_sequence=px.colors.sequential.RdBu)
+
+
+def revenue_target_bullet(query, metrics, aggregate=_compute):
+    import plotly.graph_objects as go
+    # Bullet Chart for Revenue Target
+    revenue_target = metrics['revenue_target']
+    return go.Figure(go.Indicator(
+        mode="number+gauge+delta",
+        value=metrics['total_revenue'],
+        delta={'reference': revenue_target, 'relative': True},
+        gauge={
+            'shape': "bullet",
+            'axis': {'range': [0, revenue_target]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, revenue_target * 0.5], 'color': "#FFCDD2"},
+                {'range': [revenue_target * 0.5, revenue_target * 0.8], 'color': "#FFF9C4"},
+                {'range': [revenue_target * 0.8, revenue_target], 'color': "#C8E6C9"}
+            ]
+        },
+        title={'text': "Revenue Target Achievement"}
+    ))
+
+
+def stock_by_medicine_bar(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    return px.bar(metrics['stock_by_medicine'], x='Medicine Name', y='Count',
+                  title="Stock by Medicine", color_discrete_sequence=px.colors.qualitative.Vivid)
+
+
+def timeline_rollup(query, date_column, aggregate=_compute):
+    return aggregate(('timeline', date_column),
+                     lambda: TimeRollup(query.date_sums(date_column, TIMELINE_MEASURES), date_column))
+
+
+def timeline(query, metrics, aggregate=_compute, date_column=TIMELINE_DATES[0], measure=TIMELINE_MEASURES[0],
+             start=None, end=None):
+    """`measure` over time by `date_column`, bucketed to fit TIMELINE_POINTS between `start` and `end`."""
+    import plotly.express as px
+    series, resolution = timeline_rollup(query, date_column, aggregate).series(measure, start, end)
+    return px.line(series, x=date_column, y=measure, title=f"{measure} by {date_column} (per {resolution})",
+                   line_shape='spline', color_discrete_sequence=px.colors.qualitative.Bold)
+
+
+def expiry_box(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    stats = aggregate('expiry_box', lambda: query.box_stats('Days to Expiry', 'Warehouse Location'))
+    return box_chart(stats, 'Days to Expiry', 'Warehouse Location', title="Days to Expiry by Warehouse",
+                     colors=px.colors.qualitative.Pastel)
+
+
+def expiry_kde(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    x_vals, y_vals = aggregate('expiry_kde',
+                               lambda: query.kde('Days to Expiry', points=1000))
+    fig = px.line(x=x_vals, y=y_vals, title="Days to Expiry Distribution (Normal Distribution)")
+    fig.update_layout(xaxis_title="Days to Expiry", yaxis_title="Density", template="plotly_white")
+    return fig
+
+
+def order_by_warehouse_bar(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    return px.bar(metrics['order_by_warehouse'], x='Warehouse Location', y='Order Cost', color='Supplier Name',
+                  title="Suggested Order Cost by Warehouse", hover_data=['Stock Shortfall', 'Order Units'])
+
+
+def days_of_cover_bar(query, metrics, aggregate=_compute):
+    import plotly.express as px
+    return px.bar(metrics['purchase_suggestions'], x='Medicine Name', y='Days of Cover', color='Warehouse Location',
+                  title="Days of Cover of the Most Urgent Orders", hover_data=['Supplier Name', 'Order Units'])
+
+
+# The heavier row aggregates, with the label of the expander the dashboard puts
+# them in. They are drawn after the KPIs and the other charts, and not at all
+# while collapsed.
+DEFERRED_FIGURES = {
+    'selling_price_box': "Selling Price by Category",
+    'thermometer': "Count vs Reorder Level",
+    'profit_margin_box': "Profit Margin Distribution",
+    'revenue_sunburst': "Revenue by Category",
+    'revenue_profit_scatter': "Revenue vs Profit",
+    'profit_margin_treemap': "Profit Margin by Category",
+    'expiry_box': "Days to Expiry by Warehouse",
+    'expiry_kde': "Days to Expiry Distribution",
+}
+
+# Builders per section, in layout order.
+SECTION_FIGURES = {
+    'overview': {
+        'selling_price_box': selling_price_box,
+        'thermometer': thermometer,
+        'profit_margin_box': profit_margin_box,
+    },
+    'financial': {
+        'revenue_sunburst': revenue_sunburst,
+        'avg_selling_price': avg_selling_price_bar,
+        'revenue_profit_scatter': revenue_profit_scatter,
+        'profit_margin_treemap': profit_margin_treemap,
+    },
+    'performance': {
+        'top_sales': top_sales_bar,
+        'dosage_form_pie': dosage_form_pie,
+        'profit_margin_gauge': profit_margin_gauge,
+        'revenue_pie': revenue_pie,
+        'revenue_target': revenue_target_bullet,
+    },
+    'operational': {
+        'stock_by_medicine': stock_by_medicine_bar,
+        'timeline': timeline,
+        'expiry_box': expiry_box,
+        'expiry_kde': expiry_kde,
+    },
+    'replenishment': {
+        'order_by_warehouse': order_by_warehouse_bar,
+        'days_of_cover': days_of_cover_bar,
+    },
+}
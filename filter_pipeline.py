@@ -0,0 +1,48 @@
+"""One filter selection shared by every dashboard section.
+
+The selection lives in session state, one key per filter column, so it carries
+over when switching sections. The rows it selects are computed once per
+(selection, dataset version) and cached; every section's metrics and charts
+read that one view.
+"""
+from filters import FILTER_COLUMNS
+from query_cache import normalize_selection
+
+
+class FilterPipeline:
+    def __init__(self, state, cache, version, select, columns=FILTER_COLUMNS):
+        """`select(selection)` returns the view of the matching rows, or None if there are none."""
+        self.state = state
+        self.cache = cache
+        self.version = version
+        self.select = select
+        self.columns = list(columns)
+
+    @staticmethod
+    def key(column):
+        return f"filter_{column}"
+
+    @property
+    def chosen(self):
+        """{column: chosen values}; no values chosen means no filter on that column."""
+        return {column: list(self.state.get(self.key(column), [])) for column in self.columns}
+
+    def _view(self, selection):
+        return self.cache.get_or_compute(('view', normalize_selection(selection), self.version),
+                                         lambda: self.select(selection))
+
+    def view(self):
+        """(selection, view) for the chosen filters, or for no filter when they match no rows."""
+        selection = self.chosen
+        view = self._view(selection)
+        if view is None:
+            selection = {}
+            view = self._view(selection)
+        return selection, view
+
+    def matches(self):
+        return self._view(self.chosen) is not None
+
+    def cached(self, section, selection, compute, *name):
+        """Memoize a section's aggregate of `selection` for this dataset version."""
+        return self.cache.get_or_compute((section, normalize_selection(selection), self.version) + name, compute)
@@ -0,0 +1,84 @@
+"""Bitmap index over the multiselect filter columns.
+
+For every distinct value of a filter column a packed bitset marks the rows that
+hold it. A selection is the OR of the chosen values' bitsets within a column and
+the AND across columns, so no filter has to rescan the frame.
+"""
+import copy
+
+import numpy as np
+
+FILTER_COLUMNS = ['Category', 'Dosage Form', 'Warehouse Location', 'Target Ailment', 'Supplier Name']
+
+
+class FilterIndex:
+    def __init__(self, data, columns=FILTER_COLUMNS):
+        self.rows = len(data)
+        self.values = {}
+        self.bitmaps = {}
+        for column in columns:
+            codes = data[column].cat.codes.to_numpy()
+            categories = data[column].cat.categories.tolist()
+            self.values[column] = {value: i for i, value in enumerate(categories)}
+            bitmaps = np.empty((len(categories), (self.rows + 7) // 8), dtype=np.uint8)
+            for i in range(len(categories)):
+                bitmaps[i] = np.packbits(codes == i)
+            self.bitmaps[column] = bitmaps
+
+    def bitset(self, selection):
+        """Packed bitset of the rows matching `selection` ({column: [values]}), or None for no filter."""
+        result = None
+        for column, chosen in selection.items():
+            if not chosen:
+                continue
+            lookup = self.values[column]
+            positions = [lookup[value] for value in chosen if value in lookup]
+            if positions:
+                matches = np.bitwise_or.reduce(self.bitmaps[column][positions], axis=0)
+            else:
+                matches = np.zeros(self.bitmaps[column].shape[1], dtype=np.uint8)
+            result = matches if result is None else np.bitwise_and(result, matches, out=result)
+        return result
+
+    def mask(self, selection):
+        bits = self.bitset(selection)
+        if bits is None:
+            return np.ones(self.rows, dtype=bool)
+        return np.unpackbits(bits, count=self.rows).view(bool)
+
+    def filter(self, data, selection):
+        bits = self.bitset(selection)
+        if bits is None:
+            return data
+        return data[np.unpackbits(bits, count=self.rows).view(bool)]
+
+    def copy(self):
+        """An independent index, to assign() to while this one stays in use."""
+        index = copy.copy(self)
+        index.values = {column: dict(lookup) for column, lookup in self.values.items()}
+        index.bitmaps = {column: bitmaps.copy() for column, bitmaps in self.bitmaps.items()}
+        return index
+
+    def assign(self, positions, rows):
+        """Point rows at `positions` to the filter values in `rows`, growing the index for new positions."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(positions):
+            return
+        self.rows = max(self.rows, int(positions.max()) + 1)
+        width = (self.rows + 7) // 8
+        byte = positions >> 3
+        bit = (0x80 >> (positions & 7)).astype(np.uint8)
+        for column, lookup in self.values.items():
+            values = rows[column].astype(object).to_numpy()
+            for value in dict.fromkeys(values):
+                if value not in lookup:
+                    lookup[value] = len(lookup)
+            bitmaps = self.bitmaps[column]
+            if bitmaps.shape != (len(lookup), width):
+                grown = np.zeros((len(lookup), width), dtype=np.uint8)
+                grown[:bitmaps.shape[0], :bitmaps.shape[1]] = bitmaps
+                self.bitmaps[column] = bitmaps = grown
+            for i in range(len(bitmaps)):
+                np.bitwise_and.at(bitmaps[i], byte, ~bit)
+            codes = np.array([lookup[value] for value in values])
+            np.bitwise_or.at(bitmaps, (codes, byte), bit)
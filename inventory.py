@@ -0,0 +1,220 @@
+"""Live, incrementally updated inventory dataset.
+
+Stock arrivals and posted sales are dropped as delta CSVs (same columns as the
+source export) into DELTA_DIR. Each delta is upserted on Batch Number: derived
+columns are computed for the delta rows only, existing batches are updated,
+new batches are appended, and copies of the filter and expiry indexes and the
+cube are patched rather than rebuilt.
+
+    python inventory.py path/to/delta.csv    # stage a delta for the dashboard
+    python inventory.py --compact            # fold staged deltas into the store
+"""
+import argparse
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from cube import InventoryCube
+from data_store import (CATEGORICAL_COLUMNS, IDENTIFIER_COLUMNS, SOURCE_PATH, STORE_PATH, add_derived_columns,
+                        dataset_version, load_dataset, read_meta, read_source, read_store, write_store)
+from expiry import ExpiryIndex
+from filters import FILTER_COLUMNS, FilterIndex
+
+DELTA_DIR = 'deltas'
+KEY_COLUMN = 'Batch Number'
+
+
+def read_delta(path):
+    delta = add_derived_columns(read_source(path))
+    # Within one delta file the last row for a batch wins.
+    return delta.drop_duplicates(KEY_COLUMN, keep='last').reset_index(drop=True)
+
+
+def align_categories(data, delta):
+    """Give `data` and `delta` identical categoricals, extending `data`'s dictionaries with new values."""
+    for column in CATEGORICAL_COLUMNS:
+        new_values = pd.Index(delta[column].dropna().unique()).difference(data[column].cat.categories)
+        if len(new_values):
+            data[column] = data[column].cat.add_categories(new_values)
+        delta[column] = pd.Categorical(delta[column], categories=data[column].cat.categories)
+    for column in IDENTIFIER_COLUMNS:
+        delta[column] = delta[column].astype(data[column].dtype)
+    return data, delta
+
+
+def upsert(data, delta):
+    """Apply `delta` to `data` keyed on Batch Number.
+
+    Returns the new frame, the positions of updated rows, the positions of
+    appended rows and the previous values of the updated rows. `data`
+    itself is left untouched: only columns whose values change are copied, so
+    the rest stay shared with the memory-mapped store.
+    """
+    data, delta = align_categories(data.copy(deep=False), delta)
+    delta = delta[data.columns]
+    found = pd.Index(data[KEY_COLUMN]).get_indexer(delta[KEY_COLUMN])
+    is_update = found >= 0
+    updated = found[is_update]
+    previous = data.iloc[updated].copy()
+    changes = delta[is_update].reset_index(drop=True)
+    for column in data.columns:
+        if data[column].iloc[updated].reset_index(drop=True).equals(changes[column]):
+            continue
+        patched = data[column].copy()
+        patched.iloc[updated] = changes[column].to_numpy()
+        data[column] = patched
+    appended_rows = delta[~is_update]
+    appended = np.arange(len(data), len(data) + len(appended_rows))
+    if len(appended_rows):
+        data = pd.concat([data, appended_rows], ignore_index=True)
+    return data, updated, appended, previous
+
+
+def stage_delta(path, delta_dir=DELTA_DIR):
+    """Copy a delta CSV into `delta_dir` atomically, named so deltas apply in arrival order."""
+    os.makedirs(delta_dir, exist_ok=True)
+    target = os.path.join(delta_dir, f"{time.time_ns()}-{os.path.basename(path)}")
+    shutil.copyfile(path, target + '.tmp')
+    os.replace(target + '.tmp', target)
+    return target
+
+
+def staged_deltas(delta_dir=DELTA_DIR, applied=()):
+    """Delta files in `delta_dir` whose names are not in `applied`, in arrival order."""
+    try:
+        names = sorted(name for name in os.listdir(delta_dir) if name.endswith('.csv'))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(delta_dir, name) for name in names if name not in applied]
+
+
+def uncompacted_deltas(store_path=STORE_PATH, delta_dir=DELTA_DIR):
+    """Staged delta files not yet folded into the store by compact()."""
+    return staged_deltas(delta_dir, set((read_meta(store_path) or {}).get('applied_deltas', [])))
+
+
+class InventorySnapshot:
+    """The frame, its indexes and cube at one version. Never changed once published."""
+
+    def __init__(self, data, filter_index, expiry_index, cube, version):
+        self.data = data
+        self.filter_index = filter_index
+        self.expiry_index = expiry_index
+        self.cube = cube
+        self.version = version
+
+
+class LiveInventory:
+    """The dataset plus its filter and expiry indexes, kept current as deltas arrive.
+
+    Readers take `snapshot` once and use only that: an update builds new indexes
+    and publishes them together with the new frame instead of patching the ones
+    other sessions may be reading.
+    """
+
+    def __init__(self, csv_path=SOURCE_PATH, store_path=STORE_PATH, delta_dir=DELTA_DIR):
+        self.store_path = store_path
+        self.delta_dir = delta_dir
+        self.source_version = dataset_version(csv_path)
+        data = load_dataset(csv_path, store_path)
+        # Deltas already folded into the store by compact().
+        self.applied = set((read_meta(store_path) or {}).get('applied_deltas', []))
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._publish(data, FilterIndex(data), ExpiryIndex(data['Expiry Date']), InventoryCube(data))
+        self.refresh()
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def roll_to(self, today):
+        with self._lock:
+            current = self.snapshot
+            if np.datetime64(today, 'D') != current.expiry_index.today:
+                expiry_index = current.expiry_index.copy()
+                expiry_index.roll_to(today)
+                self._publish(current.data, current.filter_index, expiry_index, current.cube)
+
+    def _publish(self, data, filter_index, expiry_index, cube):
+        # The expiry index is for today; its Days to Expiry replaces the stored values.
+        data = data.copy(deep=False)
+        data['Days to Expiry'] = expiry_index.days_to_expiry()
+        version = (self.source_version, self.generation, str(expiry_index.today))
+        self.snapshot = InventorySnapshot(data, filter_index, expiry_index, cube, version)
+
+    def pending_deltas(self):
+        return staged_deltas(self.delta_dir, self.applied)
+
+    def refresh(self):
+        """Apply any new delta files; returns {column: values touched} per applied delta, oldest first."""
+        touched = []
+        with self._lock:
+            for path in self.pending_deltas():
+                touched.append(self.apply(read_delta(path)))
+                self.applied.add(os.path.basename(path))
+        return touched
+
+    def compact(self):
+        """Fold the applied deltas into the store and remap it.
+
+        Columns patched by deltas live in private process memory; after
+        compaction they are shared through the mapped file again, and a
+        restarted worker no longer replays those deltas.
+        """
+        with self._lock:
+            current = self.snapshot
+            meta = {**(read_meta(self.store_path) or {}), 'applied_deltas': sorted(self.applied)}
+            write_store(current.data, self.store_path, meta)
+            self._publish(read_store(self.store_path), current.filter_index, current.expiry_index, current.cube)
+
+    def apply(self, delta):
+        current = self.snapshot
+        data, updated, appended, previous = upsert(current.data, delta)
+        positions = np.concatenate([updated, appended])
+        rows = data.iloc[positions]
+        filter_index = current.filter_index.copy()
+        filter_index.assign(positions, rows)
+        expiry_index = current.expiry_index.copy()
+        expiry_index.update(updated, data['Expiry Date'].iloc[updated])
+        expiry_index.append(data['Expiry Date'].iloc[appended])
+        if current.cube.covers(data):
+            cube = current.cube.copy()
+            cube.remove(previous)
+            cube.add(rows)
+        else:
+            # A delta brought a new filter value or medicine: the cube needs a new axis slot.
+            cube = InventoryCube(data)
+        self.generation += 1
+        self._publish(data, filter_index, expiry_index, cube)
+        return {
+            column: set(rows[column].astype(object)) | set(previous[column].astype(object))
+            for column in FILTER_COLUMNS
+        }
+
+
+def selection_touched(selection, touched):
+    """Whether a normalized selection could include any row a delta touched."""
+    if not selection:
+        return True
+    values = {column: {str(value) for value in changed} for column, changed in touched.items()}
+    return all(values.get(column, set()) & set(chosen) for column, chosen in selection)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stage delta CSVs for incremental ingestion.")
+    parser.add_argument('paths', nargs='*')
+    parser.add_argument('--delta-dir', default=DELTA_DIR)
+    parser.add_argument('--compact', action='store_true', help="fold all staged deltas into the store")
+    args = parser.parse_args()
+    for path in args.paths:
+        read_delta(path)
+        print(f"Staged {stage_delta(path, args.delta_dir)}")
+    if args.compact:
+        inventory = LiveInventory(delta_dir=args.delta_dir)
+        inventory.compact()
+        print(f"Compacted {len(inventory.applied)} deltas into {inventory.store_path}")
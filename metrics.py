@@ -0,0 +1,108 @@
+"""KPI and aggregate computations behind each dashboard section.
+
+Each function takes the (filtered) inventory frame, or a `query` over it from
+any backend (see queries.py), and returns a dict of the scalars and small
+aggregate frames its section displays.
+"""
+from queries import FrameQuery
+from ranking import top_groups
+from replenishment import purchase_suggestions, replenishment_plan
+
+EXPIRING_SOON_DAYS = 30
+EXPIRING_PAGE_SIZE = 50
+EXPIRING_COLUMNS = ['Medicine Name', 'Days to Expiry', 'Category']
+SUGGESTION_COLUMNS = [
+    'Medicine Name', 'Warehouse Location', 'Supplier Name', 'Below Reorder', 'Count', 'Days of Cover', 'Order Units',
+    'Order Cost',
+]
+
+# Backends add floats up in different orders, so the same average can land either
+# side of a rounding boundary; KPIs are snapped to this many digits first.
+SNAP_DIGITS = 6
+
+
+def round_kpi(value, digits):
+    """`value` rounded to `digits` the same way whichever backend computed it (and
+    as Python rounds, not numpy, which rounds 404.725 down)."""
+    return round(round(float(value), SNAP_DIGITS), digits)
+
+
+def overview_metrics(data, expiring=None, query=None):
+    """`expiring` (a ranking.ExpiringSoon) may be passed in already ordered by expiry, e.g. from an ExpiryIndex."""
+    query = query or FrameQuery(data)
+    if expiring is None:
+        expiring = query.expiring(EXPIRING_SOON_DAYS)
+    return {
+        'unique_medicines': query.nunique('Medicine Name'),
+        'avg_units_in_stock': round_kpi(query.mean('Count'), 0),
+        'expiring_soon_count': expiring.total('Count'),
+        'total_batches': query.nunique('Batch Number'),
+        'top_medicines': query.top_by('Total Revenue', 'Medicine Name', 10).reset_index(),
+        'expiring': expiring,
+        'expiring_soon': expiring.page(0, EXPIRING_PAGE_SIZE)[EXPIRING_COLUMNS],
+    }
+
+
+def financial_metrics(data, query=None):
+    query = query or FrameQuery(data)
+    return {
+        'avg_cost_price': round_kpi(query.mean('Cost Price ($)'), 2),
+        'avg_selling_price': round_kpi(query.mean('Selling Price ($)'), 2),
+        'avg_discount': round_kpi(query.mean('Discount (%)'), 2),
+        'avg_profit_margin': round_kpi(query.mean('Profit Margin (%)'), 2),
+    }
+
+
+def performance_metrics(data, query=None):
+    query = query or FrameQuery(data)
+    total_units_sold = query.sum('Units Sold')
+    threshold = 0.09 * total_units_sold
+    units_by_medicine = query.sum_by('Units Sold', 'Medicine Name')
+    leader = top_groups(units_by_medicine, 1)
+    top_seller = leader.index[0] if len(leader) and leader.iloc[0] > threshold else None
+    return {
+        'total_units_sold': total_units_sold,
+        'high_demand_medicines': int((units_by_medicine > threshold).sum()),
+        'avg_units_sold': round_kpi(query.mean('Units Sold'), 0),
+        'top_seller': top_seller,
+        'top_sales': query.top_by('Units Sold', 'Medicine Name', 10).reset_index(),
+        'avg_profit_margin': query.mean('Profit Margin (%)'),
+        'revenue_by_category': query.sum_by('Total Revenue', 'Category').reset_index(),
+        'revenue_target': 2 * query.sum('Total Cost'),
+        'total_revenue': query.sum('Total Revenue'),
+    }
+
+
+def operational_metrics(data, query=None):
+    query = query or FrameQuery(data)
+    return {
+        'avg_days_to_expiry': round_kpi(query.mean('Days to Expiry'), 0),
+        'stock_in_warehouses': query.sum('Count'),
+        'prescription_medicines': int(query.sum('Prescription Required')),
+        'avg_stock_per_category': round_kpi(query.mean_by('Count', 'Category').mean(), 0),
+        'stock_by_medicine': query.sum_by('Count', 'Medicine Name').reset_index(),
+    }
+
+
+def replenishment_metrics(data, query=None):
+    query = query or FrameQuery(data)
+    plan = replenishment_plan(query.stock_groups())
+    ordering = plan[plan['Order Units'] > 0]
+    return {
+        'below_reorder_batches': int(plan['Below Reorder'].sum()),
+        'groups_to_reorder': len(ordering),
+        'units_to_order': int(ordering['Order Units'].sum()),
+        'order_cost': round_kpi(ordering['Order Cost'].sum(), 2),
+        'purchase_suggestions': purchase_suggestions(plan, 20)[SUGGESTION_COLUMNS],
+        'order_by_warehouse': (ordering.groupby(['Warehouse Location', 'Supplier Name'], observed=True)
+                               [['Stock Shortfall', 'Order Units', 'Order Cost']].sum().reset_index()),
+    }
+
+
+SECTION_METRICS = {
+    'overview': overview_metrics,
+    'financial': financial_metrics,
+    'performance': performance_metrics,
+    'operational': operational_metrics,
+    'replenishment': replenishment_metrics,
+}
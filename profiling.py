@@ -0,0 +1,125 @@
+"""Per-rerun stage timings and single-rerun code profiles.
+
+A StageRecorder is shared by every session. Each rerun records its named
+stages (load, filter, KPIs, figure builds, chart payloads) into a RerunProfile;
+finished reruns are kept in a bounded history and can be exported as JSON
+lines or in the Prometheus text exposition format.
+"""
+import collections
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+
+PROFILERS = ['cProfile', 'pyinstrument']
+
+
+class RerunProfile:
+    def __init__(self):
+        self.started = time.time()
+        self.stages = []
+        # Seconds from the start of the rerun to named points in it.
+        self.marks = {}
+
+    @contextlib.contextmanager
+    def stage(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **labels)
+
+    def record(self, name, seconds, **labels):
+        self.stages.append({'stage': name, 'seconds': seconds, **labels})
+
+    def mark(self, name):
+        self.marks[name] = time.time() - self.started
+
+    def total(self):
+        return sum(stage['seconds'] for stage in self.stages)
+
+
+def _labels(stage):
+    return {key: value for key, value in stage.items() if key not in ('stage', 'seconds', 'bytes')}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class StageRecorder:
+    def __init__(self, history=50):
+        self.reruns = collections.deque(maxlen=history)
+        # (stage, sorted label items) -> [count, total seconds]
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def start_rerun(self):
+        return RerunProfile()
+
+    def finish(self, rerun):
+        with self._lock:
+            self.reruns.append(rerun)
+            for stage in rerun.stages:
+                key = (stage['stage'], tuple(sorted(_labels(stage).items())))
+                totals = self.totals.setdefault(key, [0, 0.0])
+                totals[0] += 1
+                totals[1] += stage['seconds']
+
+    def json_lines(self):
+        with self._lock:
+            reruns = list(self.reruns)
+        return ''.join(
+            json.dumps({'rerun': rerun.started, **stage}, default=str) + '\n'
+            for rerun in reruns for stage in rerun.stages
+        )
+
+    def prometheus(self):
+        lines = [
+            '# HELP dashboard_stage_seconds Time spent in a dashboard rerun stage.',
+            '# TYPE dashboard_stage_seconds summary',
+        ]
+        with self._lock:
+            totals = sorted(self.totals.items())
+        for (name, labels), (count, seconds) in totals:
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in (('stage', name),) + labels)
+            lines.append(f'dashboard_stage_seconds_sum{{{label_text}}} {seconds:.6f}')
+            lines.append(f'dashboard_stage_seconds_count{{{label_text}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+class CodeProfile:
+    """cProfile or pyinstrument capture of one stretch of code; `report()` returns it as text."""
+
+    def __init__(self, kind='cProfile'):
+        self.kind = kind
+        if kind == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise RuntimeError("pyinstrument is not installed; use cProfile or pip install pyinstrument")
+            self._profiler = Profiler()
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if self.kind == 'pyinstrument':
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self):
+        if self.kind == 'pyinstrument':
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def report(self, limit=60):
+        if self.kind == 'pyinstrument':
+            return self._profiler.output_text(unicode=True)
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
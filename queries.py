@@ -0,0 +1,80 @@
+"""Backend-neutral questions the dashboard asks about a filtered selection.
+
+The section metrics and figure builders never touch a frame directly; they ask
+a query object for sums, group totals, rankings and chart aggregates.
+FrameQuery answers from an in-memory pandas frame, cube.CubeSlice from
+pre-aggregated cells and sql_backend.SqlQuery by pushing SQL down to DuckDB.
+All of them return the same shapes.
+"""
+import numpy as np
+
+from charts import binned_kde, box_stats, hierarchy_sums, rollup_top_n, scatter_points
+from ranking import ExpiringSoon, top_groups
+from replenishment import stock_groups
+from timeseries import date_sums
+
+
+class FrameQuery:
+    def __init__(self, data):
+        self.data = data
+
+    def count(self):
+        return len(self.data)
+
+    def table(self, columns):
+        """The selected rows' `columns`, in row order."""
+        return self.data[columns]
+
+    def sum(self, column):
+        return self.data[column].sum()
+
+    def mean(self, column):
+        return self.data[column].mean()
+
+    def std(self, column):
+        return self.data[column].std()
+
+    def sum_by(self, column, by):
+        return self.data.groupby(by, observed=True)[column].sum()
+
+    def mean_by(self, column, by):
+        return self.data.groupby(by, observed=True)[column].mean()
+
+    def nunique(self, column):
+        return self.data[column].nunique()
+
+    def top_by(self, column, by, k):
+        """The `k` largest per-`by` totals of `column`, largest first."""
+        return top_groups(self.sum_by(column, by), k)
+
+    def expiring(self, days):
+        """A ranking.ExpiringSoon of the rows with Days to Expiry <= `days`."""
+        days_to_expiry = self.data['Days to Expiry'].to_numpy(dtype=np.float64, na_value=np.nan)
+        positions = np.flatnonzero(days_to_expiry <= days)
+        return ExpiringSoon(self.data, positions, days_to_expiry[positions])
+
+    def value_counts(self, column):
+        counts = self.data[column].value_counts()
+        # Categoricals also count their unused values; leave those out.
+        return counts[counts > 0].rename_axis(column).reset_index()
+
+    def kde(self, column, points=1000):
+        return binned_kde(self.data[column].dropna().to_numpy(), points=points)
+
+    def box_stats(self, value, group=None):
+        return box_stats(self.data, value, group)
+
+    def hierarchy_sums(self, path, values, color=None):
+        return hierarchy_sums(self.data, path, values, color)
+
+    def scatter_points(self, x, y, size, color):
+        return scatter_points(self.data, x, y, size, color)
+
+    def rollup_top_n(self, dimension, values, top_n=15, page=0, sort_by=None):
+        return rollup_top_n(self.data, dimension, values, top_n, page, sort_by)
+
+    def stock_groups(self):
+        return stock_groups(self.data)
+
+    def date_sums(self, column, measures):
+        return date_sums(self.data, column, measures)
@@ -0,0 +1,62 @@
+"""Top-K rankings and the paged expiring-soon list, without sorting whole columns.
+
+top_k finds the k-th value with np.partition in linear time and only sorts
+the winners. Group totals come from the query backends; the cube keeps
+running per-medicine sums that deltas update in place, so rankings over them
+stay current as the inventory changes.
+"""
+import numpy as np
+
+
+def top_k(values, k, largest=True):
+    """Positions of the `k` largest (or smallest) values, best first.
+
+    Ties keep their original order, as in a stable sort; NaN never ranks.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not largest:
+        values = -values
+    candidates = np.flatnonzero(~np.isnan(values))
+    if k <= 0:
+        return candidates[:0]
+    if k < len(candidates):
+        kth = np.partition(values[candidates], len(candidates) - k)[len(candidates) - k]
+        candidates = candidates[values[candidates] >= kth]
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order[:k]]
+
+
+def top_groups(totals, k):
+    """The `k` largest of a Series of group totals, largest first."""
+    return totals.iloc[top_k(totals.to_numpy(dtype=np.float64, na_value=np.nan), k)]
+
+
+class ExpiringSoon:
+    """Rows of `data` expiring within the horizon, read soonest first one page at a time.
+
+    `positions` are either already ordered by expiry (e.g. from an ExpiryIndex)
+    or come with their `days` to expiry, in which case each page is selected
+    with top_k instead of sorting the whole list.
+    """
+
+    def __init__(self, data, positions, days=None):
+        self.data = data
+        self.positions = positions
+        self.days = days
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.positions.nbytes + (self.days.nbytes if self.days is not None else 0)
+
+    def total(self, column):
+        return self.data[column].to_numpy()[self.positions].sum()
+
+    def page(self, page, page_size):
+        start, stop = page * page_size, (page + 1) * page_size
+        if self.days is None:
+            chosen = self.positions[start:stop]
+        else:
+            chosen = self.positions[top_k(self.days, stop, largest=False)[start:]]
+        return self.data.iloc[chosen]
@@ -0,0 +1,78 @@
+"""Reorder suggestions from Stock Gap (Reorder Level - Count).
+
+stock_groups rolls batches up per medicine x warehouse x supplier with one
+bincount per measure over the combined category codes, the way the cube
+buckets its cells. replenishment_plan turns those groups into days of cover
+and purchase suggestions; it only touches the groups, so it costs the same on
+any number of rows.
+"""
+import numpy as np
+import pandas as pd
+
+from ranking import top_k
+
+REPLENISHMENT_GROUPS = ['Medicine Name', 'Warehouse Location', 'Supplier Name']
+# Units Sold is read as the sales of the last SALES_WINDOW_DAYS.
+SALES_WINDOW_DAYS = 30
+# Days a purchase order takes to arrive; a group orders enough to still be at its reorder level then.
+LEAD_TIME_DAYS = 14
+# Days of Cover is capped here, which is also what groups without sales in the window show.
+MAX_DAYS_OF_COVER = 365
+
+
+def stock_groups(data, groups=REPLENISHMENT_GROUPS):
+    """Per-group Batches, Below Reorder (batches with a positive Stock Gap), Count,
+    Reorder Level, Stock Shortfall (summed positive gaps), Units Sold and mean
+    Cost Price ($), one row per group present, in category order. Rows missing a
+    group value are left out."""
+    codes = [data[column].cat.codes.to_numpy().astype(np.int64) for column in groups]
+    categories = [data[column].cat.categories for column in groups]
+    shape = tuple(len(values) for values in categories)
+    known = np.logical_and.reduce([column_codes >= 0 for column_codes in codes])
+    keys = np.ravel_multi_index([column_codes[known] for column_codes in codes], shape)
+    size = int(np.prod(shape))
+
+    def total(values):
+        return np.bincount(keys, weights=values[known], minlength=size)
+
+    gap = data['Stock Gap'].to_numpy(dtype=np.float64)
+    cost = data['Cost Price ($)'].to_numpy(dtype=np.float64, na_value=np.nan)
+    priced = ~np.isnan(cost)
+    batches = np.bincount(keys, minlength=size)
+    present = np.flatnonzero(batches)
+    priced_batches = total(priced.astype(np.float64))[present]
+    result = pd.DataFrame({
+        column: pd.Categorical.from_codes(position, values)
+        for column, position, values in zip(groups, np.unravel_index(present, shape), categories)
+    })
+    result['Batches'] = batches[present]
+    result['Below Reorder'] = total((gap > 0).astype(np.float64))[present].astype(np.int64)
+    for column in ['Count', 'Reorder Level', 'Units Sold']:
+        result[column] = total(data[column].to_numpy(dtype=np.float64))[present].astype(np.int64)
+    result['Stock Shortfall'] = total(np.clip(gap, 0, None))[present].astype(np.int64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result['Cost Price ($)'] = total(np.where(priced, cost, 0.0))[present] / priced_batches
+    return result
+
+
+def replenishment_plan(groups, sales_window_days=SALES_WINDOW_DAYS, lead_time_days=LEAD_TIME_DAYS,
+                       max_days_of_cover=MAX_DAYS_OF_COVER):
+    """`groups` from stock_groups with Daily Demand, Days of Cover, Order Units and
+    Order Cost added; a group orders up to its reorder level plus its demand over
+    the lead time."""
+    plan = groups.copy()
+    daily = plan['Units Sold'].to_numpy(dtype=np.float64) / sales_window_days
+    stock = plan['Count'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plan['Daily Demand'] = daily
+        plan['Days of Cover'] = np.where(daily > 0, np.minimum(stock / daily, max_days_of_cover), max_days_of_cover)
+    need = plan['Reorder Level'].to_numpy(dtype=np.float64) + daily * lead_time_days - stock
+    plan['Order Units'] = np.ceil(np.clip(need, 0, None)).astype(np.int64)
+    plan['Order Cost'] = plan['Order Units'] * plan['Cost Price ($)'].fillna(0)
+    return plan
+
+
+def purchase_suggestions(plan, n=20):
+    """The `n` groups with something to order and the fewest days of cover, most urgent first."""
+    ordering = plan[plan['Order Units'] > 0]
+    return ordering.iloc[top_k(ordering['Days of Cover'].to_numpy(), n, largest=False)].reset_index(drop=True)
@@ -0,0 +1,194 @@
+"""Headless section reports: every KPI and aggregate of the dashboard, without Streamlit.
+
+    from report import SiteReport
+    site = SiteReport('enhanced_medicine_inventory_dataset.csv')
+    site.metrics('overview', {'Category': ['Antibiotic']})
+
+    python report.py --sites stores/*.csv --split-by Category --output snapshots/
+
+A site is loaded once (columnar store, filter index, expiry index and cube) and
+every selection is answered from those shared structures: the cube is the one
+scan over the rows, each selection rolls up only its cells and its row mask is
+computed once for all sections. Sites are exported in parallel on a process
+pool. A site's snapshot is a directory with report.json (the selections and
+the scalar KPIs of each) and one Parquet file per aggregate table, holding the
+rows of every selection. Pointing the dashboard's DASHBOARD_SNAPSHOT at it
+serves those selections without recomputing them.
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cube import InventoryCube
+from data_store import dataset_version, load_dataset
+from expiry import ExpiryIndex
+from filters import FILTER_COLUMNS, FilterIndex
+from metrics import EXPIRING_COLUMNS, EXPIRING_PAGE_SIZE, EXPIRING_SOON_DAYS, SECTION_METRICS
+from queries import FrameQuery
+from query_cache import normalize_selection
+from ranking import ExpiringSoon
+
+REPORT_FILE = 'report.json'
+
+
+class SiteReport:
+    """One site's inventory and indexes, loaded once, and its section metrics for any selection."""
+
+    def __init__(self, csv_path, store_path=None, today=None):
+        self.name = os.path.splitext(os.path.basename(csv_path))[0]
+        self.today = np.datetime64(today or datetime.date.today(), 'D')
+        data = load_dataset(csv_path, store_path or os.path.splitext(csv_path)[0] + '.feather')
+        self.expiry_index = ExpiryIndex(data['Expiry Date'], today=self.today)
+        # Days to Expiry is derived for the report day, as the dashboard does.
+        self.data = data.copy(deep=False)
+        self.data['Days to Expiry'] = self.expiry_index.days_to_expiry()
+        self.filter_index = FilterIndex(self.data)
+        self.cube = InventoryCube(self.data)
+        # Same shape as inventory.LiveInventory.version before any delta is applied.
+        self.version = (dataset_version(csv_path), 0, str(self.today))
+
+    def metrics(self, section, selection=None):
+        return self.report(selection, [section])[section]
+
+    def report(self, selection=None, sections=SECTION_METRICS):
+        """{section: metrics} for `selection`, all sections sharing one row mask and cube slice."""
+        selection = selection or {}
+        mask = self.filter_index.mask(selection)[:len(self.data)]
+        frame = self.data[mask] if normalize_selection(selection) else self.data
+        query = self.cube.slice(selection, self.today, rows=FrameQuery(frame))
+        results = {}
+        for section in sections:
+            extra = {}
+            if section == 'overview':
+                expiring = self.expiry_index.expiring_within(EXPIRING_SOON_DAYS)
+                extra['expiring'] = ExpiringSoon(self.data, expiring[mask[expiring]])
+            results[section] = SECTION_METRICS[section](frame, query=query, **extra)
+        return results
+
+
+def _scalar(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def split_metrics(metrics):
+    """(JSON-ready scalars, {name: frame}) of one section's metrics."""
+    scalars, tables = {}, {}
+    for name, value in metrics.items():
+        if isinstance(value, ExpiringSoon):
+            tables[name] = value.page(0, len(value))[EXPIRING_COLUMNS].reset_index(drop=True)
+        elif name == 'expiring_soon':
+            # The first page of 'expiring'; rebuilt from it on load.
+            continue
+        elif isinstance(value, pd.DataFrame):
+            tables[name] = value.reset_index(drop=True)
+        elif isinstance(value, pd.Series):
+            tables[name] = value.reset_index()
+        else:
+            scalars[name] = _scalar(value)
+    return scalars, tables
+
+
+def _table_path(directory, section, name):
+    return os.path.join(directory, f"{section}.{name}.parquet")
+
+
+def export_site(csv_path, output, selections, today=None, split_by=()):
+    """Write the snapshot of every selection in {name: selection}, and of each value of the
+    `split_by` columns, for one site; returns its directory."""
+    site = SiteReport(csv_path, today=today)
+    selections = dict(selections)
+    for column in split_by:
+        for value in sorted(site.data[column].dropna().unique()):
+            selections[f"{column}={value}"] = {column: [value]}
+    directory = os.path.join(output, site.name)
+    os.makedirs(directory, exist_ok=True)
+    kpis, tables = {}, {}
+    for selection_name, selection in selections.items():
+        kpis[selection_name] = {}
+        for section, metrics in site.report(selection).items():
+            scalars, frames = split_metrics(metrics)
+            kpis[selection_name][section] = scalars
+            for name, frame in frames.items():
+                tables.setdefault((section, name), []).append(frame.assign(selection=selection_name))
+    for (section, name), frames in tables.items():
+        pd.concat(frames, ignore_index=True).to_parquet(_table_path(directory, section, name), index=False)
+    report = {
+        'site': site.name, 'version': list(site.version), 'rows': len(site.data),
+        'selections': selections, 'kpis': kpis, 'tables': sorted(f"{section}.{name}" for section, name in tables),
+    }
+    with open(os.path.join(directory, REPORT_FILE), 'w') as f:
+        json.dump(report, f, indent=1)
+    return directory
+
+
+def export_sites(csv_paths, output, selections, today=None, workers=None, split_by=()):
+    """Export every site, in parallel across processes; yields each snapshot directory as it is written."""
+    if len(csv_paths) == 1 or workers == 1:
+        for csv_path in csv_paths:
+            yield export_site(csv_path, output, selections, today, split_by)
+        return
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(export_site, csv_path, output, selections, today, split_by) for csv_path in csv_paths]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+class Snapshot:
+    """A site snapshot written by export_site, read back as section metrics."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, REPORT_FILE)) as f:
+            self.report = json.load(f)
+        self.version = tuple(self.report['version'])
+        self.names = {normalize_selection(selection): name for name, selection in self.report['selections'].items()}
+        self.tables = {}
+
+    def _table(self, section, name, selection_name):
+        if (section, name) not in self.tables:
+            table = pd.read_parquet(_table_path(self.directory, section, name))
+            self.tables[section, name] = table.drop(columns='selection'), table['selection'].to_numpy()
+        table, selections = self.tables[section, name]
+        return table[selections == selection_name].reset_index(drop=True)
+
+    def metrics(self, section, selection):
+        """The section's metrics as the dashboard computes them, or None if the selection was not exported."""
+        selection_name = self.names.get(normalize_selection(selection))
+        if selection_name is None:
+            return None
+        metrics = dict(self.report['kpis'][selection_name][section])
+        for table in self.report['tables']:
+            table_section, name = table.split('.', 1)
+            if table_section == section:
+                metrics[name] = self._table(section, name, selection_name)
+        if 'expiring' in metrics:
+            metrics['expiring'] = ExpiringSoon(metrics['expiring'], np.arange(len(metrics['expiring'])))
+            metrics['expiring_soon'] = metrics['expiring'].page(0, EXPIRING_PAGE_SIZE)
+        return metrics
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export KPI snapshots of many sites and filter selections.")
+    parser.add_argument('--sites', nargs='+', required=True, help="source CSV of each site")
+    parser.add_argument('--output', default='snapshots')
+    parser.add_argument('--selections', help="JSON file of {name: {column: [values]}}; the whole inventory is always included")
+    parser.add_argument('--split-by', nargs='*', default=[], choices=FILTER_COLUMNS,
+                        help="also report each value of these filter columns on its own")
+    parser.add_argument('--today', type=datetime.date.fromisoformat)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    selections = {'all': {}}
+    if args.selections:
+        with open(args.selections) as f:
+            selections.update(json.load(f))
+    for directory in export_sites(args.sites, args.output, selections, args.today, args.workers, args.split_by):
+        print(directory, file=sys.stderr)
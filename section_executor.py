@@ -0,0 +1,47 @@
+"""Concurrent figure builds for a dashboard section.
+
+The figures of a section only read the shared query objects and the query
+cache, so they can be built side by side on a bounded thread pool shared by
+all sessions. Each build is a ChartTask: its error or timeout is raised when
+that chart's result is collected and leaves the other charts alone.
+"""
+import concurrent.futures
+import os
+import time
+
+DEFAULT_TIMEOUT = 30.0
+
+
+class ChartTask:
+    def __init__(self, future, timeout):
+        self.future = future
+        self.deadline = time.monotonic() + timeout
+
+    def result(self):
+        """The built figure, or the build's exception; TimeoutError once the deadline has passed."""
+        try:
+            return self.future.result(max(self.deadline - time.monotonic(), 0))
+        except concurrent.futures.TimeoutError:
+            # A build that never started is dropped; one already running is left to finish in the background.
+            self.future.cancel()
+            raise TimeoutError("chart build timed out") from None
+
+
+class SectionExecutor:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix='figure')
+
+    def submit(self, build, timeout=DEFAULT_TIMEOUT):
+        return ChartTask(self.pool.submit(build), timeout)
+
+    def build_all(self, builds, timeout=DEFAULT_TIMEOUT):
+        """Build {name: build} concurrently; {name: figure or exception} in the order given."""
+        tasks = {name: self.submit(build, timeout) for name, build in builds.items()}
+        results = {}
+        for name, task in tasks.items():
+            try:
+                results[name] = task.result()
+            except Exception as error:
+                results[name] = error
+        return results
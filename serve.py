@@ -0,0 +1,75 @@
+"""Start the dashboard from a warmed-up process.
+
+    python serve.py [streamlit run options, e.g. --server.port 8501]
+    python serve.py --warm-only    # measure, then exit
+
+Before the server opens its port, this process imports the dashboard's
+modules, loads the inventory and renders every section once, unfiltered and
+with every chart open, through Streamlit's headless AppTest. st.cache_resource
+objects are shared by the whole process, so the inventory, its indexes and the
+query cache (section KPIs and chart aggregates) are in place for the first
+visitor. Import time and each section's time to first render are printed to
+stderr.
+"""
+import importlib
+import sys
+import time
+
+SCRIPT = 'Dashboard.py'
+# What the dashboard imports before drawing anything. streamlit brings in plotly and
+# plotly.graph_objects itself; only plotly.express is left to the first chart.
+MODULES = ['numpy', 'pandas', 'streamlit', 'data_store', 'inventory', 'filter_pipeline', 'metrics', 'figures']
+WARM_UP_TIMEOUT = 600
+
+
+def import_times(modules=MODULES):
+    """{module: seconds to import it}, each counting only what the modules before it did not already import."""
+    times = {}
+    for module in modules:
+        start = time.perf_counter()
+        importlib.import_module(module)
+        times[module] = time.perf_counter() - start
+    return times
+
+
+def warm_up(script=SCRIPT, timeout=WARM_UP_TIMEOUT):
+    """Render every section once, headlessly; {section button label: seconds to render}.
+
+    The first section's time includes loading the inventory, as a cold first
+    request would.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(script, default_timeout=timeout)
+    start = time.perf_counter()
+    app.run()
+    times = {}
+    sections = [button.label for button in app.main.button]
+    times[app.session_state.selected_section] = time.perf_counter() - start
+    for label in sections:
+        if label in times:
+            continue
+        start = time.perf_counter()
+        next(button for button in app.main.button if button.label == label).click().run()
+        times[label] = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(f"warm-up failed: {app.exception[0].value}")
+    return times
+
+
+def report(title, times):
+    print(f"{title}: {sum(times.values()) * 1000:.0f} ms", file=sys.stderr)
+    for name, seconds in times.items():
+        print(f"  {name:<28} {seconds * 1000:8.0f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    warm_only = '--warm-only' in args
+    report("Imports", import_times())
+    report("First render per section", warm_up())
+    if not warm_only:
+        from streamlit.web import cli
+
+        sys.argv = ['streamlit', 'run', SCRIPT, *args]
+        sys.exit(cli.main())
@@ -0,0 +1,316 @@
+"""Embedded DuckDB backend: filters, KPIs and chart aggregates run as SQL.
+
+The database is a single DuckDB file built from the columnar store (which is
+scanned through its memory map, never loaded into pandas). SqlQuery answers the
+same questions as queries.FrameQuery with filtering, grouping and top-N pushed
+down to DuckDB, so only small result sets reach Python.
+
+    python sql_backend.py    # build or refresh the database
+"""
+import datetime
+import json
+import os
+import threading
+
+import duckdb
+import numpy as np
+import pyarrow.feather as feather
+
+from charts import RAW_POINTS_LIMIT, SCATTER_BINS, binned_kde, page_rollup
+from data_store import SOURCE_PATH, STORE_PATH, build_store, read_meta, store_is_fresh
+from filters import FILTER_COLUMNS
+from replenishment import REPLENISHMENT_GROUPS
+
+DATABASE_PATH = 'enhanced_medicine_inventory_dataset.duckdb'
+TABLE = 'inventory'
+# Name the database file is attached under.
+CATALOG = 'inventory_db'
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def database_is_fresh(store_path=STORE_PATH, database_path=DATABASE_PATH):
+    if not os.path.exists(database_path):
+        return False
+    try:
+        with duckdb.connect(database_path, read_only=True) as connection:
+            built_from = connection.execute("SELECT meta FROM build_info").fetchone()[0]
+    except duckdb.Error:
+        return False
+    return json.loads(built_from) == read_meta(store_path)
+
+
+def build_database(store_path=STORE_PATH, database_path=DATABASE_PATH):
+    """Copy the store into a new DuckDB file and swap it in atomically."""
+    tmp_path = f"{database_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    store = feather.read_table(store_path, memory_map=True)
+    with duckdb.connect(tmp_path) as connection:
+        connection.register('store', store)
+        connection.execute(f"CREATE TABLE {TABLE} AS SELECT * FROM store")
+        connection.execute("CREATE TABLE build_info AS SELECT ? AS meta", [json.dumps(read_meta(store_path))])
+        connection.execute("CHECKPOINT")
+    os.replace(tmp_path, database_path)
+
+
+class SqlExpiringSoon:
+    """ranking.ExpiringSoon over SQL: counts, totals and each page are separate LIMIT/OFFSET queries."""
+
+    def __init__(self, query, days):
+        self.query = query
+        self.where = f"WHERE \"Days to Expiry\" <= {int(days)}"
+
+    def __len__(self):
+        return self.query._execute(f"SELECT count(*) FROM {self.query.source} {self.where}").fetchone()[0]
+
+    def total(self, column):
+        return self.query._execute(f"SELECT coalesce(sum({self.query._numeric(column)}), 0) FROM {self.query.source} {self.where}").fetchone()[0]
+
+    def page(self, page, page_size):
+        return self.query._frame(f"SELECT * EXCLUDE (_position) FROM {self.query.source} {self.where} "
+                                 f"ORDER BY \"Days to Expiry\", _position LIMIT {int(page_size)} OFFSET {int(page) * int(page_size)}")
+
+
+class SqlConnection:
+    """One opened version of the database file, with a cursor per thread."""
+
+    def __init__(self, database_path):
+        # Attached to a fresh in-memory database: duckdb.connect on a path already open in this
+        # process would hand back that instance, still reading the file it was opened on.
+        self.connection = duckdb.connect()
+        self.connection.execute(f"ATTACH {literal(database_path)} AS {CATALOG} (READ_ONLY)")
+        self.connection.execute(f"USE {CATALOG}")
+        self._local = threading.local()
+
+    def cursor(self):
+        # DuckDB connections are not safe to share between threads; each thread gets its own cursor.
+        if not hasattr(self._local, 'cursor'):
+            self._local.cursor = self.connection.cursor()
+            self._local.cursor.execute(f"USE {CATALOG}")
+        return self._local.cursor
+
+
+class SqlInventory:
+    """Read-only handle on the DuckDB database, rebuilt first if the store changed."""
+
+    def __init__(self, csv_path=SOURCE_PATH, store_path=STORE_PATH, database_path=DATABASE_PATH):
+        self.csv_path = csv_path
+        self.store_path = store_path
+        self.database_path = database_path
+        self.connection = self.built_from = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild and reopen the database if the store changed since it was opened,
+        e.g. when deltas were compacted into it; returns whether it did.
+
+        The old connection is never closed here: queries made before the refresh
+        keep it, and it is released once the last of them is gone.
+        """
+        with self._lock:
+            if not store_is_fresh(self.csv_path, self.store_path):
+                build_store(self.csv_path, self.store_path)
+            built_from = read_meta(self.store_path)
+            if self.connection is not None and built_from == self.built_from:
+                return False
+            if not database_is_fresh(self.store_path, self.database_path):
+                build_database(self.store_path, self.database_path)
+            connection = SqlConnection(self.database_path)
+            cursor = connection.cursor()
+            stat = os.stat(self.database_path)
+            self.types = dict(cursor.execute(f"SELECT column_name, column_type FROM (DESCRIBE {TABLE})").fetchall())
+            self.options = {
+                column: [value for (value,) in cursor.execute(
+                    f"SELECT DISTINCT {quote(column)} AS value FROM {TABLE} WHERE value IS NOT NULL ORDER BY value"
+                ).fetchall()]
+                for column in FILTER_COLUMNS
+            }
+            self.version = (f"{stat.st_mtime_ns}-{stat.st_size}",)
+            self.built_from = built_from
+            self.connection = connection
+            return True
+
+    def cursor(self):
+        return self.connection.cursor()
+
+    def query(self, selection, today=None):
+        return SqlQuery(self, selection, today)
+
+
+class SqlQuery:
+    def __init__(self, inventory, selection, today=None):
+        self.inventory = inventory
+        # Every statement of this query reads the database version it was made on.
+        self.connection = inventory.connection
+        today = today or datetime.date.today()
+        conditions = []
+        self.params = []
+        for column, chosen in selection.items():
+            if chosen:
+                conditions.append(f"{quote(column)} IN ({', '.join('?' * len(chosen))})")
+                self.params.extend(str(value) for value in chosen)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        # Days to Expiry is derived live from Expiry Date, as the in-memory path does.
+        self.selection = (
+            f"SELECT * REPLACE (date_diff('day', DATE '{np.datetime64(today, 'D')}', "
+            f"CAST(\"Expiry Date\" AS DATE)) AS \"Days to Expiry\"), rowid AS _position "
+            f"FROM {TABLE} {where}"
+        )
+        self.source = f"({self.selection}) AS selection"
+
+    def _execute(self, sql):
+        return self.connection.cursor().execute(sql, self.params)
+
+    def _scalar(self, expression):
+        return self._execute(f"SELECT {expression} FROM {self.source}").fetchone()[0]
+
+    def _frame(self, sql):
+        return self._execute(sql).df()
+
+    def _numeric(self, column):
+        if self.inventory.types.get(column) == 'BOOLEAN':
+            return f"CAST({quote(column)} AS INTEGER)"
+        return quote(column)
+
+    def count(self):
+        return self._scalar("count(*)")
+
+    def table(self, columns):
+        return self._frame(f"SELECT {', '.join(map(quote, columns))} FROM {self.source} ORDER BY _position")
+
+    def sum(self, column):
+        return self._scalar(f"coalesce(sum({self._numeric(column)}), 0)")
+
+    # SQL aggregates of no rows are NULL where pandas gives NaN.
+    def mean(self, column):
+        value = self._scalar(f"avg({self._numeric(column)})")
+        return np.nan if value is None else value
+
+    def std(self, column):
+        value = self._scalar(f"stddev_samp({self._numeric(column)})")
+        return np.nan if value is None else value
+
+    def _aggregate_by(self, function, column, by):
+        grouped = self._frame(
+            f"SELECT {quote(by)}, {function}({self._numeric(column)}) AS {quote(column)} FROM {self.source} "
+            f"WHERE {quote(by)} IS NOT NULL GROUP BY {quote(by)} ORDER BY {quote(by)}"
+        )
+        return grouped.set_index(by)[column]
+
+    def sum_by(self, column, by):
+        return self._aggregate_by('sum', column, by)
+
+    def mean_by(self, column, by):
+        return self._aggregate_by('avg', column, by)
+
+    def nunique(self, column):
+        return self._scalar(f"count(DISTINCT {quote(column)})")
+
+    def top_by(self, column, by, k):
+        grouped = self._frame(
+            f"SELECT {quote(by)}, sum({self._numeric(column)}) AS {quote(column)} FROM {self.source} "
+            f"WHERE {quote(by)} IS NOT NULL GROUP BY {quote(by)} HAVING {quote(column)} IS NOT NULL "
+            f"ORDER BY {quote(column)} DESC, {quote(by)} LIMIT {int(k)}"
+        )
+        return grouped.set_index(by)[column]
+
+    def expiring(self, days):
+        return SqlExpiringSoon(self, days)
+
+    def value_counts(self, column):
+        return self._frame(f"SELECT {quote(column)}, count(*) AS count FROM {self.source} "
+                           f"WHERE {quote(column)} IS NOT NULL GROUP BY {quote(column)} ORDER BY count DESC, {quote(column)}")
+
+    def kde(self, column, points=1000):
+        counts = self._frame(f"SELECT {quote(column)} AS value, count(*) AS weight FROM {self.source} "
+                             f"WHERE value IS NOT NULL GROUP BY value ORDER BY value")
+        return binned_kde(counts['value'].to_numpy(), points=points, weights=counts['weight'].to_numpy())
+
+    def box_stats(self, value, group=None):
+        """Quartiles, Tukey whiskers and mean of `value`, per `group` if given (see charts.box_stats)."""
+        v = quote(value)
+        key = quote(group) if group is not None else literal(value)
+        return self._frame(f"""
+            WITH rows AS (
+                SELECT CAST({key} AS VARCHAR) AS key, {v} AS v FROM {self.source}
+                WHERE {v} IS NOT NULL AND {key} IS NOT NULL
+            ), quartiles AS (
+                SELECT key, quantile_cont(v, 0.25) AS q1, quantile_cont(v, 0.5) AS median,
+                       quantile_cont(v, 0.75) AS q3, avg(v) AS mean
+                FROM rows GROUP BY key
+            )
+            SELECT key AS {quote(group or value)}, q1, median, q3, mean,
+                   min(v) FILTER (WHERE v BETWEEN q1 - 1.5 * (q3 - q1) AND q3 + 1.5 * (q3 - q1)) AS lowerfence,
+                   max(v) FILTER (WHERE v BETWEEN q1 - 1.5 * (q3 - q1) AND q3 + 1.5 * (q3 - q1)) AS upperfence
+            FROM rows JOIN quartiles USING (key)
+            GROUP BY key, q1, median, q3, mean ORDER BY key
+        """)
+
+    def hierarchy_sums(self, path, values, color=None):
+        levels = ', '.join(quote(level) for level in path)
+        weighted = (f", sum({quote(color)} * {quote(values)}) / sum({quote(values)}) AS {quote(color)}"
+                    if color is not None else '')
+        not_null = ' AND '.join(f"{quote(level)} IS NOT NULL" for level in path)
+        return self._frame(f"SELECT {levels}, sum({quote(values)}) AS {quote(values)}{weighted} "
+                           f"FROM {self.source} WHERE {not_null} GROUP BY {levels} ORDER BY {levels}")
+
+    def scatter_points(self, x, y, size, color):
+        """Raw rows when there are few enough of them, otherwise the binned grid (see charts.binned_scatter)."""
+        x, y, size, color = map(quote, (x, y, size, color))
+        if self.count() <= RAW_POINTS_LIMIT:
+            return self._frame(f"SELECT {x}, {y}, {size}, CAST({color} AS VARCHAR) AS {color} "
+                               f"FROM {self.source} ORDER BY _position")
+        return self._frame(f"""
+            WITH selection AS ({self.selection}), bounds AS (
+                SELECT min({x}) AS low_x, max({x}) AS high_x, min({y}) AS low_y, max({y}) AS high_y
+                FROM selection
+            ), binned AS (
+                SELECT CAST({color} AS VARCHAR) AS {color}, {x}, {y}, {size},
+                    round_even(({x} - low_x) / coalesce(nullif(high_x - low_x, 0), 1) * {SCATTER_BINS - 1}, 0) AS _xbin,
+                    round_even(({y} - low_y) / coalesce(nullif(high_y - low_y, 0), 1) * {SCATTER_BINS - 1}, 0) AS _ybin
+                FROM selection, bounds
+            )
+            SELECT {color}, avg({x}) AS {x}, avg({y}) AS {y}, sum({size}) AS {size}, count(*) AS "Rows"
+            FROM binned GROUP BY {color}, _xbin, _ybin ORDER BY {color}, _xbin, _ybin
+        """)
+
+    def rollup_top_n(self, dimension, values, top_n=15, page=0, sort_by=None):
+        sums = ', '.join(f"sum({quote(value)}) AS {quote(value)}" for value in values)
+        grouped = self._frame(f"SELECT {quote(dimension)}, {sums} FROM {self.source} "
+                              f"WHERE {quote(dimension)} IS NOT NULL GROUP BY {quote(dimension)} "
+                              f"ORDER BY {quote(dimension)}").set_index(dimension)
+        return page_rollup(grouped, dimension, values, top_n, page, sort_by)
+
+    def date_sums(self, column, measures):
+        sums = ', '.join(f"CAST(sum({self._numeric(measure)}) AS DOUBLE) AS {quote(measure)}" for measure in measures)
+        days = self._frame(f"SELECT CAST({quote(column)} AS DATE) AS {quote(column)}, {sums} FROM {self.source} "
+                           f"WHERE {quote(column)} IS NOT NULL GROUP BY 1 ORDER BY 1")
+        days[column] = days[column].astype('datetime64[s]')
+        return days
+
+    def stock_groups(self):
+        keys = ', '.join(map(quote, REPLENISHMENT_GROUPS))
+        sums = ', '.join(f"CAST(sum({quote(column)}) AS BIGINT) AS {quote(column)}"
+                         for column in ['Count', 'Reorder Level', 'Units Sold'])
+        return self._frame(
+            f"SELECT {keys}, count(*) AS \"Batches\", count(*) FILTER (WHERE \"Stock Gap\" > 0) AS \"Below Reorder\", "
+            f"{sums}, CAST(sum(greatest(\"Stock Gap\", 0)) AS BIGINT) AS \"Stock Shortfall\", "
+            f"avg(\"Cost Price ($)\") AS \"Cost Price ($)\" FROM {self.source} "
+            f"WHERE {' AND '.join(f'{quote(column)} IS NOT NULL' for column in REPLENISHMENT_GROUPS)} "
+            f"GROUP BY {keys} ORDER BY {keys}"
+        )
+
+
+if __name__ == '__main__':
+    if not store_is_fresh():
+        build_store()
+    build_database()
+    print(f"Built {DATABASE_PATH}")
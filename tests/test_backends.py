@@ -0,0 +1,143 @@
+"""Every section's metrics agree across the pandas, cube and DuckDB query backends."""
+import datetime
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import fake_data
+from filters import FILTER_COLUMNS
+from metrics import EXPIRING_SOON_DAYS, SECTION_METRICS
+from queries import FrameQuery
+from ranking import ExpiringSoon
+from report import SiteReport
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'enhanced_medicine_inventory_dataset.csv')
+TODAY = datetime.date(2025, 1, 1)
+SELECTIONS = 40
+
+
+@pytest.fixture(scope='module', params=['bundled', 'generated'])
+def site(request, tmp_path_factory):
+    directory = tmp_path_factory.mktemp(request.param)
+    csv_path = str(directory / 'inventory.csv')
+    if request.param == 'bundled':
+        shutil.copy(SOURCE, csv_path)
+    else:
+        fake_data.write(csv_path, 5_000, seed=1, today=TODAY)
+    return SiteReport(csv_path, today=TODAY), directory
+
+
+def random_selections(data, count, seed=0):
+    rng = np.random.default_rng(seed)
+    # No filter, a filter with nothing chosen, and a value no row holds.
+    selections = [{}, {'Category': []}, {'Category': ['No Such Category']}]
+    while len(selections) < count:
+        selection = {}
+        for column in FILTER_COLUMNS:
+            if rng.random() < 0.4:
+                values = data[column].cat.categories
+                selection[column] = rng.choice(values, rng.integers(1, min(3, len(values)) + 1), replace=False).tolist()
+        selections.append(selection)
+    return selections
+
+
+def expected_view(data, selection):
+    """The rows matching `selection`, found the way the dashboard did before the bitmap index."""
+    mask = pd.Series(True, index=data.index)
+    for column, chosen in selection.items():
+        if chosen:
+            mask &= data[column].isin(chosen)
+    return data[mask]
+
+
+def _frame(value):
+    if hasattr(value, 'page'):
+        # ExpiringSoon or its SQL counterpart: compare every row, in order.
+        value = value.page(0, len(value))
+    elif isinstance(value, pd.Series):
+        value = value.reset_index()
+    value = value.reset_index(drop=True)
+    return value.astype({column: str for column in value.columns if not pd.api.types.is_numeric_dtype(value[column])})
+
+
+def assert_same(expected, actual, name):
+    if isinstance(expected, (pd.DataFrame, pd.Series)) or hasattr(expected, 'page'):
+        expected, actual = _frame(expected), _frame(actual)
+        assert list(expected.columns) == list(actual.columns), name
+        assert len(expected) == len(actual), name
+        for column in expected.columns:
+            if pd.api.types.is_numeric_dtype(expected[column]):
+                np.testing.assert_allclose(actual[column].astype(float), expected[column].astype(float),
+                                           rtol=1e-9, err_msg=f"{name}: {column}")
+            else:
+                assert (expected[column].to_numpy() == actual[column].to_numpy()).all(), f"{name}: {column}"
+    elif isinstance(expected, float) or isinstance(actual, float):
+        assert actual == pytest.approx(expected, rel=1e-9, nan_ok=True), name
+    else:
+        assert actual == expected, name
+
+
+def backend_query(report, backend, selection, sql_inventory=None):
+    """(rows, query, extra section arguments) for `selection`, as the dashboard builds them for `backend`."""
+    mask = report.filter_index.mask(selection)[:len(report.data)]
+    view = report.data[mask]
+    expiring = report.expiry_index.expiring_within(EXPIRING_SOON_DAYS)
+    extra = {'expiring': ExpiringSoon(report.data, expiring[mask[expiring]])}
+    if backend == 'frame':
+        return view, FrameQuery(view), extra
+    if backend == 'cube':
+        return view, report.cube.slice(selection, report.today, rows=FrameQuery(view)), extra
+    return None, sql_inventory.query(selection, TODAY), {}
+
+
+@pytest.mark.parametrize('backend', ['frame', 'cube', 'sql'])
+def test_section_metrics_match_pandas(site, backend):
+    report, directory = site
+    sql_inventory = None
+    if backend == 'sql':
+        pytest.importorskip('duckdb')
+        from sql_backend import SqlInventory
+
+        sql_inventory = SqlInventory(str(directory / 'inventory.csv'), str(directory / 'inventory.feather'),
+                                     str(directory / 'inventory.duckdb'))
+    for selection in random_selections(report.data, SELECTIONS):
+        view = expected_view(report.data, selection)
+        data, query, extra = backend_query(report, backend, selection, sql_inventory)
+        for section, compute in SECTION_METRICS.items():
+            expected = compute(view)
+            actual = compute(data, query=query, **(extra if section == 'overview' else {}))
+            assert expected.keys() == actual.keys()
+            for name in expected:
+                assert_same(expected[name], actual[name], f"{section}.{name} for {selection}")
+
+
+def test_cube_group_totals_keep_integer_dtype(site):
+    report, _ = site
+    totals = report.cube.slice({}, report.today).sum_by('Count', 'Medicine Name')
+    expected = report.data.groupby('Medicine Name', observed=True)['Count'].sum()
+    assert totals.dtype == expected.dtype
+    pd.testing.assert_series_equal(totals.sort_index(), expected.sort_index(), check_index_type=False,
+                                   check_categorical=False)
+
+
+def test_sql_refresh_leaves_earlier_queries_working(tmp_path):
+    pytest.importorskip('duckdb')
+    from data_store import read_meta, read_store, write_store
+    from sql_backend import SqlInventory
+
+    csv_path, store_path = str(tmp_path / 'inventory.csv'), str(tmp_path / 'inventory.feather')
+    fake_data.write(csv_path, 500, seed=3, today=TODAY)
+    sql_inventory = SqlInventory(csv_path, store_path, str(tmp_path / 'inventory.duckdb'))
+    before = sql_inventory.query({}, TODAY)
+    assert before.count() == 500
+    # What compacting deltas does to the store: same source, new contents and meta.
+    data = read_store(store_path)
+    write_store(data.iloc[:400], store_path, {**read_meta(store_path), 'applied_deltas': ['delta.csv']})
+    assert sql_inventory.refresh()
+    assert not sql_inventory.refresh()
+    assert sql_inventory.query({}, TODAY).count() == 400
+    assert before.count() == 500
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from charts import binned_kde
+
+# Largest allowed deviation from scipy's gaussian_kde, relative to the peak density.
+KDE_TOLERANCE = 1e-3
+
+
+@pytest.mark.parametrize('values', [
+    np.random.default_rng(0).integers(0, 731, 50_000),
+    np.random.default_rng(1).normal(100, 15, 20_000),
+    np.random.default_rng(2).integers(0, 731, 5),
+], ids=['days', 'continuous', 'few'])
+def test_binned_kde_matches_gaussian_kde(values):
+    stats = pytest.importorskip('scipy.stats')
+    x_vals, y_vals = binned_kde(values)
+    expected = stats.gaussian_kde(values)(x_vals)
+    assert np.abs(y_vals - expected).max() / expected.max() <= KDE_TOLERANCE
+
+
+def test_binned_kde_weights_repeat_values():
+    values = np.array([3, 7, 7, 12, 12, 12, 40])
+    distinct, counts = np.unique(values, return_counts=True)
+    np.testing.assert_allclose(binned_kde(distinct, weights=counts)[1], binned_kde(values)[1], rtol=1e-9)
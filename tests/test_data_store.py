@@ -0,0 +1,35 @@
+"""A store streamed in many chunks still maps into pandas without a copy."""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import fake_data
+from data_store import build_store, read_store
+
+TODAY = datetime.date(2025, 1, 1)
+
+
+def test_multi_chunk_store_is_zero_copy(tmp_path):
+    csv_path = str(tmp_path / 'inventory.csv')
+    fake_data.write(csv_path, 5_000, seed=1, today=TODAY)
+    build_store(csv_path, str(tmp_path / 'whole.feather'))
+    store_path = str(tmp_path / 'chunked.feather')
+    chunks = []
+    build_store(csv_path, store_path, chunk_bytes=64 << 10, progress=lambda *args: chunks.append(args))
+    assert len(chunks) > 1
+
+    with pa.memory_map(store_path) as source:
+        assert ipc.open_file(source).num_record_batches == 1
+    allocated = pa.total_allocated_bytes()
+    data = read_store(store_path)
+    # Only small per-column bookkeeping is allocated, not the columns themselves.
+    assert pa.total_allocated_bytes() - allocated < (tmp_path / 'chunked.feather').stat().st_size // 10
+    for column in ['Count', 'Total Revenue', 'Expiry Date']:
+        assert not data[column].to_numpy().flags.writeable, column
+    assert not data['Category'].cat.codes.to_numpy().flags.writeable
+
+    pd.testing.assert_frame_equal(data, read_store(str(tmp_path / 'whole.feather')))
+    assert not [path.name for path in tmp_path.iterdir() if '.tmp' in path.name]
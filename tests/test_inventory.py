@@ -0,0 +1,153 @@
+"""Deltas patch copies of the indexes and cube to what a full rebuild would give."""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import fake_data
+from cube import InventoryCube
+from data_store import SOURCE_ENCODING, load_dataset
+from expiry import ExpiryIndex
+from filters import FILTER_COLUMNS, FilterIndex
+from inventory import LiveInventory, stage_delta
+
+TODAY = datetime.date(2025, 1, 1)
+
+
+@pytest.fixture
+def source(tmp_path):
+    csv_path = str(tmp_path / 'inventory.csv')
+    fake_data.write(csv_path, 2_000, seed=2, today=TODAY)
+    return csv_path
+
+
+@pytest.fixture
+def data(source, tmp_path):
+    return load_dataset(source, str(tmp_path / 'inventory.feather'))
+
+
+def _read_raw(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False, encoding=SOURCE_ENCODING)
+
+
+def _write_raw(frame, path):
+    frame.to_csv(path, index=False, encoding=SOURCE_ENCODING)
+    return path
+
+
+def make_delta(raw, seed=0):
+    """Some existing batches with new counts, warehouses and expiry dates, plus some new batches."""
+    rng = np.random.default_rng(seed)
+    updates = raw.iloc[np.sort(rng.choice(len(raw), 50, replace=False))].copy()
+    updates['Count'] = rng.integers(0, 500, len(updates)).astype(str)
+    updates['Warehouse Location'] = rng.choice(raw['Warehouse Location'].unique(), len(updates))
+    updates['Expiry Date'] = rng.choice(raw['Expiry Date'].unique(), len(updates))
+    added = raw.iloc[rng.choice(len(raw), 30, replace=False)].copy()
+    added['Batch Number'] = [f"BATCH-NEW-{i}" for i in range(len(added))]
+    return updates, added
+
+
+def selections(data):
+    yield {}
+    for column in FILTER_COLUMNS:
+        yield {column: data[column].cat.categories[:2].tolist()}
+    yield {column: data[column].cat.categories[::2].tolist() for column in FILTER_COLUMNS[:3]}
+
+
+def test_filter_index_assign_matches_rebuild(data):
+    index = FilterIndex(data)
+    changed = data.copy()
+    changed['Category'] = changed['Category'].shift(1).fillna(changed['Category'].iloc[0])
+    appended = changed.iloc[:7]
+    changed = pd.concat([changed, appended], ignore_index=True)
+    patched = index.copy()
+    positions = np.concatenate([np.arange(len(data)), np.arange(len(data), len(changed))])
+    patched.assign(positions, changed.iloc[positions])
+    rebuilt = FilterIndex(changed)
+    for selection in selections(changed):
+        np.testing.assert_array_equal(patched.mask(selection), rebuilt.mask(selection), err_msg=str(selection))
+    # The copy was patched, not the index it came from.
+    for selection in selections(data):
+        np.testing.assert_array_equal(index.mask(selection), FilterIndex(data).mask(selection))
+
+
+def test_expiry_index_update_and_append_match_rebuild(data):
+    dates = data['Expiry Date']
+    index = ExpiryIndex(dates, today=TODAY)
+    rng = np.random.default_rng(0)
+    positions = np.sort(rng.choice(len(dates), 40, replace=False))
+    new_dates = dates.iloc[rng.choice(len(dates), 40)].to_numpy()
+    appended = dates.iloc[rng.choice(len(dates), 25)].to_numpy()
+    patched = index.copy()
+    patched.update(positions, new_dates)
+    patched.append(appended)
+
+    expected = dates.to_numpy().copy()
+    expected[positions] = new_dates
+    rebuilt = ExpiryIndex(np.concatenate([expected, appended]), today=TODAY)
+    np.testing.assert_array_equal(patched.days_to_expiry(), rebuilt.days_to_expiry())
+    for days in [-30, 0, 30, 365]:
+        # Rows expiring the same day may come in any order.
+        np.testing.assert_array_equal(np.sort(patched.expiring_within(days)), np.sort(rebuilt.expiring_within(days)))
+        np.testing.assert_array_equal(np.sort(patched.expiring_between(days, days + 90)),
+                                      np.sort(rebuilt.expiring_between(days, days + 90)))
+    assert len(index) == len(dates)
+    np.testing.assert_array_equal(index.days_to_expiry(), ExpiryIndex(dates, today=TODAY).days_to_expiry())
+
+
+def test_cube_remove_and_add_match_rebuild(data):
+    cube = InventoryCube(data)
+    positions = np.arange(0, len(data), 7)
+    changed = data.copy()
+    changed.loc[positions, 'Count'] = changed.loc[positions, 'Count'] + 11
+    changed.loc[positions, 'Supplier Name'] = changed['Supplier Name'].cat.categories[0]
+    patched = cube.copy()
+    patched.remove(data.iloc[positions])
+    patched.add(changed.iloc[positions])
+    rebuilt = InventoryCube(changed)
+    for selection in selections(changed):
+        ours, theirs = patched.slice(selection, TODAY), rebuilt.slice(selection, TODAY)
+        assert ours.count() == theirs.count()
+        for column in ['Count', 'Total Revenue', 'Days to Expiry']:
+            assert ours.sum(column) == pytest.approx(theirs.sum(column))
+            assert ours.std(column) == pytest.approx(theirs.std(column), nan_ok=True)
+        pd.testing.assert_series_equal(ours.sum_by('Count', 'Supplier Name'), theirs.sum_by('Count', 'Supplier Name'))
+    assert cube.slice({}, TODAY).sum('Count') == int(data['Count'].sum())
+
+
+def test_applied_delta_matches_full_rebuild(source, tmp_path):
+    raw = _read_raw(source)
+    updates, added = make_delta(raw)
+    delta_path = _write_raw(pd.concat([updates, added]), str(tmp_path / 'delta.csv'))
+    merged = raw.copy()
+    merged.loc[updates.index] = updates
+    rebuilt_path = _write_raw(pd.concat([merged, added], ignore_index=True), str(tmp_path / 'rebuilt.csv'))
+
+    delta_dir = str(tmp_path / 'deltas')
+    inventory = LiveInventory(source, str(tmp_path / 'inventory.feather'), delta_dir)
+    inventory.roll_to(TODAY)
+    before = inventory.snapshot
+    before_data = before.data.copy()
+    stage_delta(delta_path, delta_dir)
+    assert len(inventory.refresh()) == 1
+    current = inventory.snapshot
+    rebuilt = LiveInventory(rebuilt_path, str(tmp_path / 'rebuilt.feather'), str(tmp_path / 'none'))
+    rebuilt.roll_to(TODAY)
+    expected = rebuilt.snapshot
+
+    pd.testing.assert_frame_equal(current.data, expected.data, check_categorical=False)
+    for selection in selections(expected.data):
+        np.testing.assert_array_equal(current.filter_index.mask(selection)[:len(current.data)],
+                                      expected.filter_index.mask(selection), err_msg=str(selection))
+        ours, theirs = current.cube.slice(selection, TODAY), expected.cube.slice(selection, TODAY)
+        assert ours.count() == theirs.count()
+        assert ours.sum('Count') == theirs.sum('Count')
+    np.testing.assert_array_equal(np.sort(current.expiry_index.expiring_within(90)),
+                                  np.sort(expected.expiry_index.expiring_within(90)))
+
+    # The earlier snapshot is untouched, so a run still reading it stays consistent.
+    pd.testing.assert_frame_equal(before.data, before_data)
+    assert before.filter_index.rows == len(before.data)
+    assert len(before.expiry_index) == len(before.data)
+    assert before.cube.slice({}, TODAY).count() == len(before.data)
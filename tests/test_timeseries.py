@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeseries import TimeRollup, date_sums
+
+
+@pytest.fixture(scope='module')
+def rows():
+    rng = np.random.default_rng(0)
+    count = 5_000
+    return pd.DataFrame({
+        'Expiry Date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 3_000, count), unit='D'),
+        'Count': rng.integers(1, 10, count),
+        'Units Sold': rng.integers(0, 5, count),
+        'Total Revenue': rng.random(count),
+    })
+
+
+@pytest.mark.parametrize('resolution', ['day', 'week', 'month'])
+@pytest.mark.parametrize('start, end', [
+    (None, None), ('2021-03-17', '2022-11-04'), ('2021-03-01', '2021-03-31'), ('2021-03-17', '2021-03-20'),
+    ('2019-01-01', '2030-01-01'),
+])
+def test_window_counts_exactly_the_days_in_range(rows, resolution, start, end):
+    rollup = TimeRollup(date_sums(rows, 'Expiry Date'), 'Expiry Date')
+    window = rollup.window(resolution, 'Count', start, end)
+    dates = rows['Expiry Date']
+    inside = (dates >= (start or dates.min())) & (dates <= (end or dates.max()))
+    assert window['Count'].sum() == rows.loc[inside, 'Count'].sum()
+    if start is not None:
+        assert window.index[0] >= pd.Timestamp(start)
+
+
+def test_partial_first_month_is_kept_at_range_start(rows):
+    rollup = TimeRollup(date_sums(rows, 'Expiry Date'), 'Expiry Date')
+    window = rollup.window('month', 'Count', '2021-03-17', '2021-06-04')
+    assert list(window.index) == list(pd.to_datetime(['2021-03-17', '2021-04-01', '2021-05-01', '2021-06-01']))
+    dates = rows['Expiry Date']
+    assert window['Count'].iloc[0] == rows.loc[(dates >= '2021-03-17') & (dates <= '2021-03-31'), 'Count'].sum()
@@ -0,0 +1,124 @@
+"""Time-bucketed rollups of the inventory by expiry or manufacture date.
+
+date_sums adds the measures up per calendar day with one bincount each.
+TimeRollup rolls those days up once into day, week and month buckets; a
+chart asks it for a date range and gets the finest bucketing that fits the
+point budget, downsampled with Largest-Triangle-Three-Buckets (LTTB) when even
+months do not fit. Chart payloads stay bounded however long the history is.
+"""
+import numpy as np
+import pandas as pd
+
+TIMELINE_DATES = ['Expiry Date', 'Manufacture Date']
+TIMELINE_MEASURES = ['Count', 'Units Sold', 'Total Revenue']
+TIMELINE_POINTS = 500
+# Finest first; weeks start on Monday.
+RESOLUTIONS = {'day': None, 'week': 'W-MON', 'month': 'MS'}
+
+
+def date_sums(data, column, measures=TIMELINE_MEASURES):
+    """Per-day sums of `measures` over the rows' `column` date, for the days that have rows, in date order."""
+    days = data[column].to_numpy(dtype='datetime64[D]')
+    known = ~np.isnat(days)
+    days = days[known].astype(np.int64)
+    if not len(days):
+        return pd.DataFrame({column: pd.Series(dtype='datetime64[s]'), **{m: pd.Series(dtype=float) for m in measures}})
+    first = days.min()
+    offsets = days - first
+    present = np.flatnonzero(np.bincount(offsets))
+    result = {column: (present + first).astype('datetime64[D]').astype('datetime64[s]')}
+    for measure in measures:
+        values = data[measure].to_numpy(dtype=np.float64, na_value=np.nan)[known]
+        result[measure] = np.bincount(offsets, weights=np.nan_to_num(values))[present]
+    return pd.DataFrame(result)
+
+
+def lttb(x, y, points):
+    """Positions of `points` samples of the series (x, y) picked by Largest-Triangle-Three-Buckets.
+
+    The first and last samples are always kept; every bucket in between keeps
+    the sample forming the largest triangle with the previous pick and the
+    mean of the next bucket.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n) if points >= n else np.array([0, n - 1][:points])
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    chosen = np.empty(points, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        start, stop = edges[i], edges[i + 1]
+        following = slice(stop, edges[i + 2] if i + 2 < len(edges) else n)
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+        area = np.abs((x[previous] - mean_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        chosen[i + 1] = previous
+    return chosen
+
+
+class TimeRollup:
+    """date_sums of one date column rolled up to every resolution."""
+
+    def __init__(self, daily, column):
+        self.column = column
+        daily = daily.set_index(column)
+        self.buckets = {}
+        for resolution, frequency in RESOLUTIONS.items():
+            if not len(daily):
+                self.buckets[resolution] = daily
+            elif frequency is None:
+                # Days without rows are zeros, not gaps.
+                self.buckets[resolution] = daily.asfreq('D', fill_value=0.0)
+            else:
+                self.buckets[resolution] = daily.resample(frequency, label='left', closed='left').sum()
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + sum(int(frame.memory_usage(index=True).sum()) for frame in self.buckets.values())
+
+    def span(self):
+        """(first, last) day with rows, as datetime.date, or (None, None) when there are none."""
+        days = self.buckets['day'].index
+        if not len(days):
+            return None, None
+        return days[0].date(), days[-1].date()
+
+    def window(self, resolution, measure, start=None, end=None):
+        """`measure` per `resolution` bucket over [start, end]. Buckets cut by the range count only its
+        days, and the first one is labelled with `start` rather than dropped for beginning before it."""
+        buckets = self.buckets[resolution]
+        start = pd.Timestamp(start) if start else None
+        end = pd.Timestamp(end) if end else None
+        if resolution == 'day' or not len(buckets):
+            return buckets.loc[start:end, [measure]]
+        labels = buckets.index
+        first = max(labels.searchsorted(start, 'right') - 1, 0) if start is not None else 0
+        last = labels.searchsorted(end, 'right') if end is not None else len(labels)
+        window = buckets.iloc[first:last][[measure]]
+        if not len(window):
+            return window
+        days = self.buckets['day'][measure]
+        one_day = pd.Timedelta(days=1)
+        values = window[measure].to_numpy(copy=True)
+        for i, position in {0: first, len(window) - 1: last - 1}.items():
+            low = max(labels[position], start) if start is not None else labels[position]
+            high = labels[position + 1] - one_day if position + 1 < len(labels) else None
+            if end is not None:
+                high = end if high is None else min(high, end)
+            values[i] = days.loc[low:high].sum()
+        index = labels[first:last]
+        if start is not None and index[0] < start:
+            index = index.delete(0).insert(0, start)
+        return pd.DataFrame({measure: values}, index=index.rename(self.column))
+
+    def series(self, measure, start=None, end=None, points=TIMELINE_POINTS):
+        """(frame of `column`, `measure` for [start, end], label of its resolution), at most `points` rows."""
+        for resolution in self.buckets:
+            window = self.window(resolution, measure, start, end)
+            if len(window) <= points:
+                return window.reset_index(), resolution
+        picks = lttb(window.index.to_numpy(dtype='datetime64[D]').astype(np.int64), window[measure].to_numpy(), points)
+        return window.iloc[picks].reset_index(), f"{resolution}, {points} points"